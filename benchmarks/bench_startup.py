@@ -0,0 +1,87 @@
+# Benchmark: what each entry point pays at import, before doing any work.
+# Every measurement runs in a fresh interpreter so nothing is already cached.
+#
+#   python -m benchmarks.bench_startup
+#   python -m benchmarks.bench_startup --first-use   # also time the lazy resources
+
+import re
+import subprocess
+import sys
+import time
+
+# What each entry point imports at startup (dashboard.py itself builds the
+# Streamlit page at import, so its import list is reproduced instead)
+ENTRY_POINTS = {
+    "cli (main.py)": "import main",
+    "monitor": "import components.monitor",
+    "dashboard": (
+        "import streamlit; import main; "
+        "import components.memory, components.intelligence, components.utils"
+    ),
+}
+
+# Heavy resources that are now created on first use
+FIRST_USE = {
+    "ChatGroq client": "from components.intelligence import get_llm; get_llm()",
+    "embedding model": "from components.memory import get_embedder; get_embedder()",
+    "Chroma collection": "from components.memory import get_collection; get_collection()",
+    "perception engine": "from components.perception import get_engine; get_engine()",
+}
+
+REPEATS = 3
+
+
+def timed_run(code: str):
+    """Wall time of `code` in a fresh interpreter, excluding interpreter boot."""
+    script = f"import time; _t = time.perf_counter(); {code}; print(time.perf_counter() - _t)"
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else "failed")
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def _import_times(code: str):
+    """{top-level package: cumulative microseconds}, from `python -X importtime`."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    totals = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)", line)
+        if match and len(match.group(2)) == 1:  # Top-level entries only
+            package = match.group(3).split(".")[0]
+            totals[package] = totals.get(package, 0) + int(match.group(1))
+    return totals
+
+
+def heaviest_imports(code: str, top: int = 5):
+    """The packages `code` spends the most import time on (interpreter boot excluded)."""
+    boot = _import_times("pass")
+    totals = {k: v for k, v in _import_times(code).items() if k not in boot}
+    return sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:top]
+
+
+def report(label: str, code: str, show_imports: bool):
+    try:
+        times = sorted(timed_run(code) for _ in range(REPEATS))
+    except RuntimeError as e:
+        print(f"{label:<20} | failed: {e}")
+        return
+    print(f"{label:<20} | median {times[len(times) // 2]:6.2f}s | best {times[0]:6.2f}s")
+    if show_imports:
+        for package, micros in heaviest_imports(code):
+            print(f"{'':<20} |   {package:<24} {micros / 1e6:6.2f}s")
+
+
+if __name__ == "__main__":
+    started = time.perf_counter()
+    print(f"Import cost per entry point ({REPEATS} fresh interpreters each)")
+    print("-" * 60)
+    for label, code in ENTRY_POINTS.items():
+        report(label, code, show_imports=True)
+
+    if "--first-use" in sys.argv:
+        print("\nFirst-use cost of the lazily created resources")
+        print("-" * 60)
+        for label, code in FIRST_USE.items():
+            report(label, code, show_imports=False)
+
+    print(f"\nDone in {time.perf_counter() - started:.0f}s")
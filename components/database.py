@@ -1,7 +1,13 @@
 # This file defines schema (the "Shape" of data) and handles saving/loading.
 
 import datetime
-from sqlalchemy import create_engine, Column, String, Integer, Float, Text, DateTime, Boolean
+import json
+import re
+import numpy as np
+from sqlalchemy import (
+    create_engine, Column, String, Integer, Float, Text, DateTime, Boolean, Index,
+    select, delete, func, and_, or_, text, bindparam
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -29,8 +35,97 @@ class VideoMemory(Base):
     lowest_confidence = Column(Float)
     is_flagged = Column(Boolean, default=False)   #True if "Suspicious" was found
 
+    # Newest-first feed pages are read straight off this index (keyset pagination)
+    __table_args__ = (Index("ix_video_memories_processed", "processed_at", "id"),)
+
+# Define the "TranscriptSegment" Table
+# Per-segment data, so re-scoring / re-summarizing / re-indexing never needs a
+# re-transcription. Written in bulk and read back column-wise (no ORM objects).
+class TranscriptSegment(Base):
+    __tablename__ = "transcript_segments"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    video_id = Column(String, nullable=False)
+    start_time = Column(Float, nullable=False)
+    end_time = Column(Float)
+    speaker = Column(String)
+    text = Column(Text)
+    confidence = Column(Float)
+    noise_level = Column(Float)
+    trust_score = Column(Float)
+    is_flagged = Column(Boolean, default=False)
+
+    __table_args__ = (Index("ix_transcript_segments_video_time", "video_id", "start_time"),)
+
+SEGMENT_COLUMNS = ["start_time", "end_time", "speaker", "text", "confidence", "noise_level", "trust_score", "is_flagged"]
+
+# Define the "PipelineStage" Table
+# One row per (video, stage): lets run_voxguard resume from the last completed
+# stage instead of re-downloading and re-transcribing after a crash.
+PIPELINE_STAGES = ["ingestion", "perception", "report", "save", "vectorize", "notify"]
+
+class PipelineStage(Base):
+    __tablename__ = "pipeline_stages"
+
+    video_id = Column(String, primary_key=True, index=True)
+    stage = Column(String, primary_key=True)
+    status = Column(String)         # "done" or "failed"
+    output = Column(Text)           # JSON payload needed by later stages
+    error = Column(Text)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+# Define the "MemoryChunk" Table
+# Mirror of every retrieval chunk in the vector store, plus an FTS5 index over
+# its text, so Neural Search can run exact keyword (BM25) queries next to the
+# vector ones and both can be filtered on the same metadata.
+class MemoryChunk(Base):
+    __tablename__ = "memory_chunks"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)  # = FTS rowid
+    chunk_id = Column(String, unique=True, nullable=False)      # = Chroma ID
+    video_id = Column(String, nullable=False, index=True)
+    title = Column(String)
+    text = Column(Text)
+    start_time = Column(Float)
+    end_time = Column(Float)
+    speaker = Column(String)
+    confidence = Column(Float)
+    trust_score = Column(Float)
+    is_flagged = Column(Boolean, default=False)
+    indexed_at = Column(Float)  # Unix time, for date-range filters
+
+CHUNK_COLUMNS = ["chunk_id", "video_id", "title", "text", "start_time", "end_time",
+                 "speaker", "confidence", "trust_score", "is_flagged", "indexed_at"]
+
+# Define the "AppState" Table
+# Named counters bumped on every write to a dataset, so readers in other
+# processes (the dashboard) can tell when their cached copy is stale.
+class AppState(Base):
+    __tablename__ = "app_state"
+
+    key = Column(String, primary_key=True)
+    version = Column(Integer, default=0)
+
 # Create the tables (Run this once on import)
 Base.metadata.create_all(bind=engine)
+# create_all skips tables that already exist, so add indexes introduced later by hand
+for table in (VideoMemory.__table__,):
+    for index in table.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+def _create_keyword_index():
+    try:
+        with engine.begin() as conn:
+            conn.exec_driver_sql(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS memory_chunks_fts "
+                "USING fts5(text, tokenize='porter unicode61')"
+            )
+        return True
+    except Exception as e:
+        print(f"⚠️ Keyword index unavailable (SQLite built without FTS5?): {e}")
+        return False
+
+KEYWORD_INDEX_AVAILABLE = _create_keyword_index()
 
 
 
@@ -44,8 +139,307 @@ def get_video_by_id(video_id: str):
     finally:
         db.close()
 
+def get_version(key: str) -> int:
+    """Current value of a change counter (0 if it was never bumped)."""
+    with engine.connect() as conn:
+        version = conn.execute(select(AppState.version).where(AppState.key == key)).scalar()
+    return version or 0
+
+def bump_version(key: str):
+    """Marks a dataset as changed (e.g. "analyses" after save_analysis)."""
+    with engine.begin() as conn:
+        updated = conn.execute(
+            AppState.__table__.update().where(AppState.key == key).values(version=AppState.version + 1)
+        ).rowcount
+        if not updated:
+            conn.execute(AppState.__table__.insert().values(key=key, version=1))
+
+def get_feed_stats():
+    """Dashboard headline numbers, aggregated in SQL: {total, avg_confidence, flagged}."""
+    with engine.connect() as conn:
+        total, avg_conf, flagged = conn.execute(select(
+            func.count(VideoMemory.id),
+            func.avg(VideoMemory.avg_confidence),
+            func.sum(func.cast(VideoMemory.is_flagged, Integer)),
+        )).one()
+    return {"total": total or 0, "avg_confidence": avg_conf, "flagged": flagged or 0}
+
+def get_feed_page(limit: int = 20, after: tuple = None):
+    """
+    One page of the newest-first feed, without transcripts or reports.
+    `after` is the (processed_at, id) of the previous page's last row (keyset
+    pagination: every page is an index range scan, however deep).
+    Returns a list of dicts (id, title, avg_confidence, is_flagged, processed_at).
+    """
+    query = select(
+        VideoMemory.id, VideoMemory.title, VideoMemory.avg_confidence,
+        VideoMemory.is_flagged, VideoMemory.processed_at,
+    )
+    if after is not None:
+        processed_at, video_id = after
+        query = query.where(or_(
+            VideoMemory.processed_at < processed_at,
+            and_(VideoMemory.processed_at == processed_at, VideoMemory.id < video_id),
+        ))
+    query = query.order_by(VideoMemory.processed_at.desc(), VideoMemory.id.desc()).limit(limit)
+    with engine.connect() as conn:
+        return [dict(row._mapping) for row in conn.execute(query)]
+
+def get_report(video_id: str):
+    """Just the report text of one video (None if unknown)."""
+    with engine.connect() as conn:
+        return conn.execute(select(VideoMemory.summary_report).where(VideoMemory.id == video_id)).scalar()
+
+def record_stage(video_id: str, stage: str, status: str, output=None, error: str = None):
+    """Checkpoint a pipeline stage (output is stored as JSON)."""
+    db = SessionLocal()
+    try:
+        db.merge(PipelineStage(
+            video_id=video_id,
+            stage=stage,
+            status=status,
+            output=json.dumps(output) if output is not None else None,
+            error=error,
+            updated_at=datetime.datetime.utcnow()
+        ))
+        db.commit()
+    except Exception as e:
+        print(f"❌ Checkpoint Error ({stage}): {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+def get_stage_output(video_id: str, stage: str):
+    """Returns the stored output of a COMPLETED stage, or None if it hasn't finished."""
+    db = SessionLocal()
+    try:
+        row = db.query(PipelineStage).filter(
+            PipelineStage.video_id == video_id,
+            PipelineStage.stage == stage,
+            PipelineStage.status == "done"
+        ).first()
+        if row is None:
+            return None
+        return json.loads(row.output) if row.output else {}
+    finally:
+        db.close()
+
+def get_pipeline_status(video_id: str):
+    """{stage: status} for every stage recorded so far."""
+    db = SessionLocal()
+    try:
+        rows = db.query(PipelineStage).filter(PipelineStage.video_id == video_id).all()
+        return {row.stage: row.status for row in rows}
+    finally:
+        db.close()
+
+def is_pipeline_complete(video_id: str):
+    status = get_pipeline_status(video_id)
+    return all(status.get(stage) == "done" for stage in PIPELINE_STAGES)
+
+def get_unfinished_videos():
+    """[(video_id, url)] for videos with a failed stage, so the monitor can retry them."""
+    db = SessionLocal()
+    try:
+        failed_ids = [row.video_id for row in db.query(PipelineStage.video_id).filter(
+            PipelineStage.status == "failed").distinct()]
+        unfinished = []
+        for video_id in failed_ids:
+            # The ingestion row keeps the URL (even when the download itself failed)
+            ingestion = db.query(PipelineStage).filter(
+                PipelineStage.video_id == video_id,
+                PipelineStage.stage == "ingestion"
+            ).first()
+            url = json.loads(ingestion.output).get("url") if ingestion and ingestion.output else None
+            if url:
+                unfinished.append((video_id, url))
+        return unfinished
+    finally:
+        db.close()
+
+def save_segments(video_id: str, segments: list):
+    """Bulk-write a video's segments (replacing any earlier copy). Returns True on success."""
+    rows = [{
+        "video_id": video_id,
+        "start_time": float(seg['start']),
+        "end_time": float(seg['end']),
+        "speaker": str(seg['speaker']),
+        "text": seg['text'],
+        "confidence": float(seg['confidence']),
+        "noise_level": float(seg['noise_level']),
+        "trust_score": float(seg['trust_score']),
+        "is_flagged": seg['status'] == "⚠️ Suspicious",
+    } for seg in segments]
+
+    table = TranscriptSegment.__table__
+    try:
+        # One transaction, one executemany: no per-row ORM objects
+        with engine.begin() as conn:
+            conn.execute(delete(table).where(table.c.video_id == video_id))
+            if rows:
+                conn.execute(table.insert(), rows)
+        return True
+    except Exception as e:
+        print(f"❌ Database Error (segments): {e}")
+        return False
+
+def load_segments(video_id: str):
+    """
+    Columnar read of a video's segments, ordered by time:
+    {"start_time": np.ndarray, ..., "text": np.ndarray(dtype=object)}.
+    """
+    table = TranscriptSegment.__table__
+    query = select(*[table.c[name] for name in SEGMENT_COLUMNS]).where(
+        table.c.video_id == video_id).order_by(table.c.start_time)
+    with engine.connect() as conn:
+        rows = conn.execute(query).fetchall()
+
+    columns = list(zip(*rows)) if rows else [[] for _ in SEGMENT_COLUMNS]
+    dtypes = {"speaker": object, "text": object, "is_flagged": bool}
+    return {name: np.asarray(col, dtype=dtypes.get(name, np.float64))
+            for name, col in zip(SEGMENT_COLUMNS, columns)}
+
+def load_segments_frame(video_id: str = None):
+    """Segments as a pandas DataFrame (one video, or all of them)."""
+    import pandas as pd  # Only needed by analysis/dashboard callers
+
+    table = TranscriptSegment.__table__
+    query = select(table.c.video_id, *[table.c[name] for name in SEGMENT_COLUMNS])
+    if video_id is not None:
+        query = query.where(table.c.video_id == video_id)
+    return pd.read_sql(query.order_by(table.c.video_id, table.c.start_time), engine)
+
+def load_segment_dicts(video_id: str):
+    """Rebuild the pipeline's segment dicts (as produced by PerceptionEngine) from the table."""
+    cols = load_segments(video_id)
+    return [{
+        "start": float(cols["start_time"][i]),
+        "end": float(cols["end_time"][i]),
+        "speaker": cols["speaker"][i],
+        "text": cols["text"][i],
+        "confidence": float(cols["confidence"][i]),
+        "noise_level": float(cols["noise_level"][i]),
+        "trust_score": float(cols["trust_score"][i]),
+        "status": "⚠️ Suspicious" if cols["is_flagged"][i] else "✅ Verified",
+    } for i in range(len(cols["start_time"]))]
+
+def save_chunks(rows: list):
+    """
+    Upserts retrieval chunks (dicts with CHUNK_COLUMNS) into memory_chunks and
+    the keyword index, in one transaction. Returns True on success.
+    """
+    if not rows:
+        return True
+    table = MemoryChunk.__table__
+    chunk_ids = [row["chunk_id"] for row in rows]
+    try:
+        with engine.begin() as conn:
+            _delete_chunk_rows(conn, table.c.chunk_id.in_(chunk_ids))
+            conn.execute(table.insert(), [{name: row.get(name) for name in CHUNK_COLUMNS} for row in rows])
+            if KEYWORD_INDEX_AVAILABLE:
+                conn.execute(text(
+                    "INSERT INTO memory_chunks_fts (rowid, text) "
+                    "SELECT id, text FROM memory_chunks WHERE chunk_id IN :ids"
+                ).bindparams(bindparam("ids", expanding=True)), {"ids": chunk_ids})
+        return True
+    except Exception as e:
+        print(f"❌ Database Error (chunks): {e}")
+        return False
+
+def delete_chunks(video_id: str):
+    """Drops one video's chunks from memory_chunks and the keyword index."""
+    try:
+        with engine.begin() as conn:
+            _delete_chunk_rows(conn, MemoryChunk.__table__.c.video_id == video_id)
+        return True
+    except Exception as e:
+        print(f"❌ Database Error (chunks): {e}")
+        return False
+
+def delete_chunk_ids(chunk_ids: list):
+    """Drops specific chunks (by chunk_id) from memory_chunks and the keyword index."""
+    table = MemoryChunk.__table__
+    chunk_ids = list(chunk_ids)
+    try:
+        with engine.begin() as conn:
+            for i in range(0, len(chunk_ids), 500):  # Stay under SQLite's bound-parameter limit
+                _delete_chunk_rows(conn, table.c.chunk_id.in_(chunk_ids[i:i + 500]))
+        return True
+    except Exception as e:
+        print(f"❌ Database Error (chunks): {e}")
+        return False
+
+def clear_chunks():
+    """Empties memory_chunks and the keyword index (before a full rebuild)."""
+    try:
+        with engine.begin() as conn:
+            if KEYWORD_INDEX_AVAILABLE:
+                conn.exec_driver_sql("DELETE FROM memory_chunks_fts")
+            conn.execute(delete(MemoryChunk.__table__))
+        return True
+    except Exception as e:
+        print(f"❌ Database Error (chunks): {e}")
+        return False
+
+def _delete_chunk_rows(conn, condition):
+    table = MemoryChunk.__table__
+    ids = [row[0] for row in conn.execute(select(table.c.id).where(condition))]
+    if not ids:
+        return
+    if KEYWORD_INDEX_AVAILABLE:
+        conn.execute(text("DELETE FROM memory_chunks_fts WHERE rowid IN :ids").bindparams(bindparam("ids", expanding=True)), {"ids": ids})
+    conn.execute(delete(table).where(table.c.id.in_(ids)))
+
+def chunk_filter_clause(filters: dict):
+    """
+    SQL version of the search filters (see memory.search_memory):
+    video_id (str or list), exclude_flagged, min_confidence, indexed_after, indexed_before.
+    Returns (sql, params) for a WHERE on memory_chunks (aliased c).
+    """
+    filters = filters or {}
+    clauses, params = [], {}
+    video_ids = filters.get("video_id")
+    if video_ids:
+        video_ids = [video_ids] if isinstance(video_ids, str) else list(video_ids)
+        placeholders = ", ".join(f":vid{i}" for i in range(len(video_ids)))
+        clauses.append(f"c.video_id IN ({placeholders})")
+        params.update({f"vid{i}": v for i, v in enumerate(video_ids)})
+    if filters.get("exclude_flagged"):
+        clauses.append("c.is_flagged = 0")
+    if filters.get("min_confidence") is not None:
+        clauses.append("c.confidence >= :min_confidence")
+        params["min_confidence"] = float(filters["min_confidence"])
+    if filters.get("indexed_after") is not None:
+        clauses.append("c.indexed_at >= :indexed_after")
+        params["indexed_after"] = float(filters["indexed_after"])
+    if filters.get("indexed_before") is not None:
+        clauses.append("c.indexed_at <= :indexed_before")
+        params["indexed_before"] = float(filters["indexed_before"])
+    return (" AND ".join(clauses) or "1 = 1"), params
+
+def keyword_search(query: str, limit: int = 20, filters: dict = None):
+    """
+    BM25-ranked keyword search over chunk text (FTS5), with the filters applied
+    in the same query. Returns chunk dicts, best first.
+    """
+    # Plain words only: FTS5 query syntax (quotes, NEAR, *, -) is not exposed to users
+    terms = re.findall(r"\w+", query.lower())
+    if not KEYWORD_INDEX_AVAILABLE or not terms:
+        return []
+    where, params = chunk_filter_clause(filters)
+    columns = ", ".join(f"c.{name}" for name in CHUNK_COLUMNS)
+    sql = text(
+        f"SELECT {columns}, bm25(memory_chunks_fts) AS rank "
+        f"FROM memory_chunks_fts JOIN memory_chunks c ON c.id = memory_chunks_fts.rowid "
+        f"WHERE memory_chunks_fts MATCH :match AND {where} "
+        f"ORDER BY rank LIMIT :limit"
+    )
+    params.update({"match": " OR ".join(f'"{term}"' for term in terms), "limit": int(limit)})
+    with engine.connect() as conn:
+        return [dict(row._mapping) for row in conn.execute(sql, params)]
+
 def save_analysis(video_id: str, title: str, url: str, transcript: str, report: str, segments: list):
-    """Save the full analysis to the DB."""
+    """Save the full analysis to the DB. Returns True on success."""
     db = SessionLocal()
     
     # Calculate simple stats from the segments
@@ -68,11 +462,15 @@ def save_analysis(video_id: str, title: str, url: str, transcript: str, report:
     )
     
     try:
-        db.add(new_memory)
+        # merge (not add) so a resumed run can safely re-save the same video
+        db.merge(new_memory)
         db.commit()
+        bump_version("analyses")  # Invalidates the dashboard's cached feed
         print(f"💾 Memory Saved: {title} (Trust Score: {avg_conf:.2f})")
+        return True
     except Exception as e:
         print(f"❌ Database Error: {e}")
         db.rollback()
+        return False
     finally:
         db.close()
\ No newline at end of file
@@ -1,19 +1,94 @@
 import os
+import re
+import time
+from urllib.parse import urlparse, parse_qs
 import yt_dlp
 
+from components.utils import get_settings
+
+# YouTube video IDs are 11 chars of [A-Za-z0-9_-]
+VIDEO_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{11}$")
+# Hosts (and their subdomains: m., music.) that serve YouTube videos
+YOUTUBE_DOMAINS = ("youtube.com", "youtube-nocookie.com")
+# Path-style URLs: youtu.be/ID, /shorts/ID, /embed/ID, /live/ID, /v/ID
+PATH_ID_PATTERN = re.compile(r"^/(?:shorts/|embed/|live/|v/|e/)?([A-Za-z0-9_-]{11})(?:[/?#]|$)")
+
+def parse_video_id(url: str):
+    """
+    Pulls the video ID out of any common YouTube URL shape without touching
+    the network. Returns None if the URL isn't recognisable.
+    """
+    url = url.strip()
+    if VIDEO_ID_PATTERN.match(url):
+        return url  # A bare ID
+
+    parsed = urlparse(url if "://" in url else f"https://{url}")
+    host = (parsed.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+
+    if host == "youtu.be" or any(host == domain or host.endswith("." + domain) for domain in YOUTUBE_DOMAINS):
+        # watch?v=ID (also m./music. subdomains and attribution links)
+        video_id = parse_qs(parsed.query).get("v", [None])[0]
+        if video_id and VIDEO_ID_PATTERN.match(video_id):
+            return video_id
+
+        path = parsed.path
+        if host != "youtu.be" and not re.match(r"^/(shorts|embed|live|v|e)/", path):
+            return None  # Channel pages, playlists, etc.
+        match = PATH_ID_PATTERN.match(path)
+        if match:
+            return match.group(1)
+    return None
+
+def resolve_video_id(youtube_url: str):
+    """
+    Canonical video ID for a URL, before any audio is fetched.
+    Tries the local parser first and falls back to a metadata-only yt-dlp
+    extraction (no download) for anything unusual.
+    """
+    video_id = parse_video_id(youtube_url)
+    if video_id:
+        return video_id
+
+    try:
+        with yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True, 'skip_download': True}) as ydl:
+            info = ydl.extract_info(youtube_url, download=False, process=False)
+            return info.get('id') if info else None
+    except Exception as e:
+        print(f"⚠️ Could not resolve video ID: {e}")
+        return None
+
 def download_audio(youtube_url: str, output_dir: str = "data"):
     # Ensure output directory exists
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
-    # Configure yt dlp for best audio quality and wav conversion
+    # Convert straight to what perception consumes (16 kHz mono), so nothing
+    # downstream has to resample and the intermediate file stays small.
+    # FLAC (default) is lossless and roughly half the size of the same WAV.
+    settings = get_settings("ingestion")
+    audio_format = settings["audio_format"]
+    sample_rate = str(settings["sample_rate"])
+
+    timings = {}
+    def _time_conversion(d):
+        # yt-dlp reports 'started'/'finished' around each postprocessor
+        if d.get('postprocessor') == 'ExtractAudio':
+            if d['status'] == 'started':
+                timings['conversion_start'] = time.perf_counter()
+            elif d['status'] == 'finished':
+                timings['conversion'] = time.perf_counter() - timings.get('conversion_start', time.perf_counter())
+
+    # Configure yt dlp for best audio quality and 16 kHz mono conversion
     ydl_opts = {
         'format': 'bestaudio/best',
         'postprocessors': [{
             'key': 'FFmpegExtractAudio',
-            'preferredcodec': 'wav',
-            'preferredquality': '192',
+            'preferredcodec': audio_format,
         }],
+        'postprocessor_args': {'extractaudio': ['-ar', sample_rate, '-ac', '1']},
+        'postprocessor_hooks': [_time_conversion],
         'outtmpl': f'{output_dir}/%(id)s.%(ext)s',
         'quiet': True,
         'no_warnings': True
@@ -22,6 +97,7 @@ def download_audio(youtube_url: str, output_dir: str = "data"):
     try:
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             print(f"⬇️  Downloading metadata: {youtube_url}...")
+            started = time.perf_counter()
             
             # Extract video information and download
             info = ydl.extract_info(youtube_url, download=True)
@@ -30,10 +106,17 @@ def download_audio(youtube_url: str, output_dir: str = "data"):
             video_id = info['id']
             video_title = info['title']
             
-            # Construct the final file path
-            file_path = os.path.join(output_dir, f"{video_id}.wav")
+            # The file yt-dlp actually wrote: the extension follows the codec
+            # (vorbis -> .ogg, aac -> .m4a), so don't rebuild it from audio_format
+            downloads = info.get('requested_downloads') or [{}]
+            file_path = downloads[0].get('filepath') or os.path.join(output_dir, f"{video_id}.{audio_format}")
             
             print(f"✅ Download complete: {video_title}")
+            total = time.perf_counter() - started
+            conversion = timings.get('conversion', 0.0)
+            size_mb = os.path.getsize(file_path) / (1024 * 1024) if os.path.exists(file_path) else 0.0
+            print(f"   📦 {size_mb:.1f} MB written ({sample_rate} Hz mono {audio_format}) | "
+                  f"download {total - conversion:.1f}s | conversion {conversion:.1f}s")
             
             # Return path, title, and ID for downstream use
             return file_path, video_title, video_id
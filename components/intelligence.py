@@ -2,47 +2,332 @@
 
 import os
 import time  # for rate limiting
+import random
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
 from langchain_text_splitters import RecursiveCharacterTextSplitter 
 
+from components.utils import get_settings
+from components.cache import DiskCache, make_key
+
 # Load environment variables
 load_dotenv()
 
-# Initialize the LLM
-llm = ChatGroq(
-    temperature=0, 
-    model_name="llama-3.1-8b-instant",
-    api_key=os.getenv("GROQ_API_KEY")
+LLM_SETTINGS = get_settings("llm")
+RAG_SETTINGS = get_settings("rag")
+
+LLM_TEMPERATURE = 0
+
+# The Groq client is built on first use, so importing this module (dashboard,
+# monitor) doesn't pay for langchain_groq until an LLM call is actually made
+_llm = None
+_llm_lock = threading.Lock()
+
+def get_llm():
+    """Returns the shared ChatGroq client, creating it on first use."""
+    global _llm
+    with _llm_lock:
+        if _llm is None:
+            from langchain_groq import ChatGroq
+            _llm = ChatGroq(
+                temperature=LLM_TEMPERATURE, 
+                model_name=LLM_SETTINGS["model"],
+                api_key=os.getenv("GROQ_API_KEY")
+            )
+    return _llm
+
+# Tokens reserved for the completion when charging the token bucket
+COMPLETION_RESERVE_TOKENS = 512
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter for the provider's requests/min and tokens/min quotas.
+    Shared by every LLM call in the process, so concurrent map calls (and the
+    dashboard, and the monitor's LLM pool) all draw from the same budget.
+    """
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.rpm = float(requests_per_minute)
+        self.tpm = float(tokens_per_minute)
+        self._requests = self.rpm
+        self._tokens = self.tpm
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last
+        self._last = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    def acquire(self, tokens: int):
+        """Blocks until one request and `tokens` tokens are available."""
+        tokens = min(tokens, self.tpm)  # A single oversized call must still be able to run
+        while True:
+            with self._lock:
+                self._refill()
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+                # Sleep just long enough for the scarcer bucket to refill
+                wait = max(
+                    (1 - self._requests) * 60 / self.rpm,
+                    (tokens - self._tokens) * 60 / self.tpm,
+                )
+            time.sleep(max(wait, 0.05))
+
+
+rate_limiter = RateLimiter(LLM_SETTINGS["requests_per_minute"], LLM_SETTINGS["tokens_per_minute"])
+
+# Persistent response cache: a byte-identical prompt (repeated dashboard question,
+# report rebuilt after a crash) is answered from disk instead of the API
+CACHE_SETTINGS = get_settings("llm_cache")
+response_cache = DiskCache(
+    CACHE_SETTINGS["path"],
+    ttl_seconds=CACHE_SETTINGS["ttl_hours"] * 3600 if CACHE_SETTINGS["ttl_hours"] else None,
+    max_entries=CACHE_SETTINGS["max_entries"],
 )
 
-def chunk_transcript_text(text: str, chunk_size=6000): 
+# Token counts drive the prompt budget and transcript chunking. They are exact
+# only with the model's own tokenizer (llm.tokenizer: a Hugging Face repo whose
+# tokenizer.json matches llm.model); otherwise they are a ~4 chars/token estimate.
+# Loaded (or given up on) once per process, never per call.
+_tokenizer = None
+_tokenizer_checked = False
+_tokenizer_lock = threading.Lock()
+
+def _get_tokenizer():
+    global _tokenizer, _tokenizer_checked
+    with _tokenizer_lock:
+        if not _tokenizer_checked:
+            _tokenizer_checked = True
+            name = LLM_SETTINGS["tokenizer"]
+            if name:
+                try:
+                    from tokenizers import Tokenizer  # Installed with faster-whisper
+                    _tokenizer = Tokenizer.from_pretrained(name, token=os.getenv("HF_TOKEN"))
+                except Exception as e:
+                    print(f"⚠️ Could not load tokenizer '{name}': {e}")
+            if _tokenizer is None:
+                print("⚠️ Token counts are estimates (~4 chars/token). Set llm.tokenizer for exact counts.")
+    return _tokenizer
+
+def count_tokens(text: str) -> int:
+    """Token count for budgeting: exact with llm.tokenizer, otherwise an estimate of ~4 chars/token."""
+    tokenizer = _get_tokenizer()
+    if tokenizer is None:
+        return len(text) // 4 + 1
+    return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    message = str(error).lower()
+    return type(error).__name__ == "RateLimitError" or "429" in message or "rate limit" in message
+
+def _cache_key(prompt, inputs: dict):
+    # The rendered prompt covers both the template and its inputs
+    return make_key(LLM_SETTINGS["model"], LLM_TEMPERATURE, prompt.format(**inputs))
+
+def _invoke(prompt, inputs: dict):
     """
-    Splits a long string into smaller chunks.
-    Default 6000 chars is roughly 1.5k tokens (safe for Free Tier).
+    Runs prompt | llm under the response cache and the shared rate limiter.
+    429s are retried with exponential backoff (+ jitter); other errors propagate
+    (and are never cached).
     """
-    chunks = []
-    while len(text) > chunk_size:
-        split_index = text.rfind('\n', 0, chunk_size)
-        if split_index == -1:
-            split_index = chunk_size
-        
-        chunks.append(text[:split_index])
-        text = text[split_index:]
-    
-    chunks.append(text) 
-    return chunks
+    key = _cache_key(prompt, inputs)
+    cached = response_cache.get(key)
+    if cached is not None:
+        print("   ⚡ LLM cache hit")
+        return cached
+
+    chain = prompt | get_llm() | StrOutputParser()
+    prompt_tokens = sum(count_tokens(str(v)) for v in inputs.values())
+    for attempt in range(LLM_SETTINGS["max_retries"] + 1):
+        rate_limiter.acquire(prompt_tokens + COMPLETION_RESERVE_TOKENS)
+        try:
+            response = chain.invoke(inputs)
+            response_cache.set(key, response)
+            return response
+        except Exception as e:
+            if not _is_rate_limit_error(e) or attempt == LLM_SETTINGS["max_retries"]:
+                raise
+            backoff = min(60, 2 ** attempt) + random.uniform(0, 1)
+            print(f"   ⏳ Rate limited, retrying in {backoff:.1f}s...")
+            time.sleep(backoff)
+
+def _stream(prompt, inputs: dict, stats: dict = None):
+    """
+    Streaming twin of _invoke: yields text as the tokens arrive.
+    Cached responses are replayed in one piece, without delay. 429s are retried
+    only before the first token (after that, a failure propagates).
+    If `stats` is given it is filled with time_to_first_token, tokens,
+    tokens_per_second and cached.
+    """
+    started = time.perf_counter()
+    key = _cache_key(prompt, inputs)
+    cached = response_cache.get(key)
+    if cached is not None:
+        print("   ⚡ LLM cache hit")
+        if stats is not None:
+            stats.update(cached=True, time_to_first_token=time.perf_counter() - started,
+                         tokens=count_tokens(cached), tokens_per_second=None)
+        yield cached
+        return
 
-def generate_report(video_title: str, segments: list):
+    chain = prompt | get_llm() | StrOutputParser()
+    prompt_tokens = sum(count_tokens(str(v)) for v in inputs.values())
+    for attempt in range(LLM_SETTINGS["max_retries"] + 1):
+        rate_limiter.acquire(prompt_tokens + COMPLETION_RESERVE_TOKENS)
+        request_start = time.perf_counter()
+        first_token_at = None
+        parts = []
+        try:
+            for piece in chain.stream(inputs):
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                parts.append(piece)
+                yield piece
+            break
+        except Exception as e:
+            if parts or not _is_rate_limit_error(e) or attempt == LLM_SETTINGS["max_retries"]:
+                raise
+            backoff = min(60, 2 ** attempt) + random.uniform(0, 1)
+            print(f"   ⏳ Rate limited, retrying in {backoff:.1f}s...")
+            time.sleep(backoff)
+
+    response = "".join(parts)
+    response_cache.set(key, response)
+
+    finished = time.perf_counter()
+    first_token_at = first_token_at or finished
+    tokens = count_tokens(response)
+    generation_time = finished - first_token_at
+    tokens_per_second = tokens / generation_time if generation_time > 0 else None
+    print(f"\n   ⏱️  First token after {first_token_at - request_start:.2f}s | {tokens} tokens"
+          + (f" @ {tokens_per_second:.0f} tok/s" if tokens_per_second else ""))
+    if stats is not None:
+        stats.update(cached=False, time_to_first_token=first_token_at - request_start,
+                     tokens=tokens, tokens_per_second=tokens_per_second)
+
+# Room left in one prompt for the transcript: the model's context window,
+# capped by the per-minute token quota (a bigger call could never be sent),
+# minus the completion reserve and the prompt template itself
+PROMPT_OVERHEAD_TOKENS = 800
+PROMPT_BUDGET_TOKENS = (min(LLM_SETTINGS["context_window"], LLM_SETTINGS["tokens_per_minute"])
+                        - COMPLETION_RESERVE_TOKENS - PROMPT_OVERHEAD_TOKENS)
+# Transcripts that fit go out in one prompt; longer ones use Map-Reduce
+SINGLE_SHOT_MAX_TOKENS = PROMPT_BUDGET_TOKENS
+# Map parts fill the prompt unless a smaller size is configured (fewer, fuller calls)
+MAP_CHUNK_TOKENS = min(LLM_SETTINGS["map_chunk_tokens"] or PROMPT_BUDGET_TOKENS, PROMPT_BUDGET_TOKENS)
+# Section summaries longer than this are condensed again before the final Reduce
+REDUCE_MAX_TOKENS = PROMPT_BUDGET_TOKENS
+
+def _speaker_break(speakers: list, lo: int, hi: int, counts: list, used: int):
+    """End index for a full chunk: the last speaker change in its final fifth, else hi."""
+    dropped = 0
+    for j in range(hi - 1, lo, -1):
+        dropped += counts[j]
+        if dropped > used * 0.2:
+            break
+        if speakers[j] != speakers[j - 1]:
+            return j
+    return hi
+
+def chunk_lines(lines: list, max_tokens: int = None, overlap_tokens: int = None,
+                speakers: list = None, counts: list = None, carried: int = 0):
+    """
+    Packs whole lines into chunks of at most max_tokens (counted once per line,
+    so this is linear in the transcript). Each chunk repeats up to overlap_tokens
+    of the previous one's tail, and with `speakers` (one per line) a chunk
+    prefers to end where the speaker changes. A single line longer than
+    max_tokens becomes a chunk of its own.
+    """
+    return ["\n".join(lines[start:end])
+            for start, end in chunk_spans(lines, max_tokens, overlap_tokens, speakers, counts, carried)]
+
+def chunk_spans(lines: list, max_tokens: int = None, overlap_tokens: int = None,
+                speakers: list = None, counts: list = None, carried: int = 0):
+    """
+    chunk_lines() as (start, end) line ranges. The last span is the only one
+    that could still grow if more lines were appended, which lets streaming
+    send every earlier span to the Map step early and resume from the last one
+    (`carried`: how many leading lines are overlap from an earlier chunk).
+    """
+    max_tokens = max_tokens or MAP_CHUNK_TOKENS
+    if overlap_tokens is None:
+        overlap_tokens = LLM_SETTINGS["chunk_overlap_tokens"]
+    overlap_tokens = min(overlap_tokens, max_tokens // 4)
+    if counts is None:
+        counts = [count_tokens(line) + 1 for line in lines]  # +1 for the newline
+
+    spans = []
+    start, fresh = 0, carried  # chunk starts at `start`; lines from `fresh` on are new
+    used = sum(counts[:carried])
+    i = carried
+    while i < len(lines):
+        if used + counts[i] <= max_tokens or i == fresh:
+            used += counts[i]
+            i += 1
+            continue
+        end = _speaker_break(speakers, fresh, i, counts, used) if speakers else i
+        spans.append((start, end))
+
+        # Carry the tail of this chunk into the next one (never the whole chunk)
+        chunk_start, start, used = start, end, 0
+        while start - 1 > chunk_start and used + counts[start - 1] <= overlap_tokens:
+            start -= 1
+            used += counts[start]
+        if used + counts[end] > max_tokens:
+            start, used = end, 0
+        fresh = i = end
+
+    if fresh < len(lines):
+        spans.append((start, len(lines)))
+    return spans
+
+def chunk_transcript_text(text: str, max_tokens: int = None, overlap_tokens: int = None):
+    """Splits a long string into token-bounded chunks on line breaks."""
+    return chunk_lines(text.split("\n"), max_tokens, overlap_tokens)
+
+def format_transcript(segments: list):
+    """One '[12.3s] SPEAKER_00: text' line per segment."""
+    return "\n".join([f"[{s['start']:.1f}s] {s['speaker']}: {s['text']}" for s in segments])
+
+def generate_report(video_title: str, segments: list, precomputed_summaries: tuple = None):
     """
     Generates a professional Intelligence Report.
     Automatically switches between 'Single-Shot' and 'Map-Reduce' based on length.
+
+    precomputed_summaries: optional (covered, carried, summaries) from a streaming
+    run: the Map step already summarized everything before segment `covered`,
+    and the `carried` segments from there on are overlap from its last part.
     """
     print("🧠 Generating Intelligence Report...")
+    prompt, inputs, mode = _report_request(video_title, segments, precomputed_summaries)
+    try:
+        return _invoke(prompt, inputs)
+    except Exception as e:
+        return f"❌ Error in {mode} generation: {e}"
 
+def generate_report_stream(video_title: str, segments: list, precomputed_summaries: tuple = None,
+                           stats: dict = None):
+    """
+    Streaming variant of generate_report: yields the final report as it is
+    written (the Map phase of long videos still completes first).
+    Errors propagate instead of being returned as text.
+    """
+    print("🧠 Generating Intelligence Report...")
+    prompt, inputs, _ = _report_request(video_title, segments, precomputed_summaries)
+    yield from _stream(prompt, inputs, stats)
+
+def _report_request(video_title: str, segments: list, precomputed_summaries: tuple = None):
+    """Everything up to the final LLM call. Returns (prompt, inputs, mode name)."""
     # Prepare Audit Log
     suspicious_segments = [s for s in segments if s['status'] == "⚠️ Suspicious"]
     audit_log = "\n".join([f"- {s['start']:.1f}s: {s['speaker']} | Confidence {s['confidence']:.2f} (Flagged)" for s in suspicious_segments])
@@ -50,21 +335,30 @@ def generate_report(video_title: str, segments: list):
     if not audit_log:
         audit_log = "No acoustic anomalies detected."
 
-    # Prepare Full Transcript
-    transcript_text = "\n".join([f"[{s['start']:.1f}s] {s['speaker']}: {s['text']}" for s in segments])
+    # Prepare Full Transcript (one line per segment, each counted once)
+    lines = [format_transcript([s]) for s in segments]
+    counts = [count_tokens(line) + 1 for line in lines]
+    total_tokens = sum(counts)
 
     # Check Length & Dispatch Strategy 
-    if len(transcript_text) < 15000:
-        print(f"   Mode: Standard (Short Video - {len(transcript_text)} chars)")
-        return _generate_single_shot(video_title, transcript_text, audit_log)
-    else:
-        print(f"   Mode: Map-Reduce (Long Video detected: {len(transcript_text)} chars)")
-        return _generate_map_reduce(video_title, transcript_text, audit_log)
+    if total_tokens <= SINGLE_SHOT_MAX_TOKENS:
+        print(f"   Mode: Standard (Short Video - {total_tokens} tokens)")
+        return (*_single_shot_request(video_title, "\n".join(lines), audit_log), "Single-Shot")
+
+    print(f"   Mode: Map-Reduce (Long Video detected: {total_tokens} tokens)")
+    covered, carried, summaries = 0, 0, None
+    if precomputed_summaries:
+        # Only the tail that streaming didn't get to still needs the Map step
+        covered, carried, summaries = precomputed_summaries
+        print(f"   Reusing {len(summaries)} part summaries from streaming.")
+    chunks = chunk_lines(lines[covered:], speakers=[s['speaker'] for s in segments[covered:]],
+                         counts=counts[covered:], carried=carried)
+    return (*_map_reduce_request(video_title, chunks, audit_log, summaries), "Map-Reduce")
 
 
-def _generate_single_shot(title, transcript, audit_log):
+def _single_shot_request(title, transcript, audit_log):
     """
-    ADAPTIVE logic for shorter videos.
+    ADAPTIVE logic for shorter videos. Returns (prompt, inputs).
     """
     word_count = len(transcript.split())
     
@@ -103,52 +397,63 @@ def _generate_single_shot(title, transcript, audit_log):
         Keep the tone professional, objective, and concise.
         """
     )
-    chain = prompt | llm | StrOutputParser()
+    return prompt, {
+        "title": title,
+        "transcript": transcript,
+        "audit_log": audit_log,
+        "length_instruction": length_instruction,
+        "diarization_instruction": diarization_instruction # Passed correctly now
+    }
+
+_map_prompt = ChatPromptTemplate.from_template(
+    """
+    Summarize this segment of a video transcript in bullet points.
+    Capture key technical terms, arguments, and speaker names.
     
+    TRANSCRIPT SEGMENT:
+    {transcript_part}
+    """
+)
+
+def summarize_transcript_part(transcript_part: str):
+    """Map step: summarize one chunk of transcript. Returns None on failure."""
     try:
-        return chain.invoke({
-            "title": title,
-            "transcript": transcript,
-            "audit_log": audit_log,
-            "length_instruction": length_instruction,
-            "diarization_instruction": diarization_instruction # Passed correctly now
-        })
+        # --- RATE LIMIT PROTECTION --- (token bucket + 429 backoff, no fixed sleeps)
+        return _invoke(_map_prompt, {"transcript_part": transcript_part})
     except Exception as e:
-        return f"❌ Error in Single-Shot generation: {e}"
+        print(f"   ⚠️ Error summarizing part: {e}")
+        return None
 
-def _generate_map_reduce(title, transcript, audit_log):
-    """New logic for LONG videos (Map-Reduce)."""
-    
-    # A. Chunk the transcript
-    chunks = chunk_transcript_text(transcript)
-    print(f"   Split into {len(chunks)} parts for processing.")
+def _map_concurrently(parts: list):
+    """Summarizes parts in parallel, keeping their original order. Failed parts are dropped."""
+    if not parts:
+        return []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=LLM_SETTINGS["max_concurrency"]) as pool:
+        summaries = list(pool.map(summarize_transcript_part, parts))
+    print(f"   Mapped {len(parts)} parts in {time.perf_counter() - started:.1f}s")
+    return [s for s in summaries if s]
+
+def _map_reduce_request(title, chunks, audit_log, prior_summaries=None):
+    """New logic for LONG videos (Map-Reduce): runs the Map phase, returns the Reduce (prompt, inputs)."""
     
-    # B. Map Phase (Summarize each chunk)
-    map_prompt = ChatPromptTemplate.from_template(
-        """
-        Summarize this segment of a video transcript in bullet points.
-        Capture key technical terms, arguments, and speaker names.
-        
-        TRANSCRIPT SEGMENT:
-        {transcript_part}
-        """
-    )
-    map_chain = map_prompt | llm | StrOutputParser()
+    # A. Transcript chunks (empty when streaming already covered everything)
+    print(f"   Split into {len(chunks)} parts for processing ({MAP_CHUNK_TOKENS} tokens max).")
     
-    chunk_summaries = []
-    for i, chunk in enumerate(chunks):
-        print(f"   Processing Part {i+1}/{len(chunks)}...")
-        try:
-            summary = map_chain.invoke({"transcript_part": chunk})
-            chunk_summaries.append(summary)
-            
-            # --- RATE LIMIT PROTECTION ---
-            time.sleep(5) 
-            
-        except Exception as e:
-            print(f"   ⚠️ Error summarizing part {i+1}: {e}")
-            
+    # B. Map Phase (Summarize chunks concurrently; the rate limiter paces them)
+    chunk_summaries = [s for s in (prior_summaries or []) if s]
+    chunk_summaries += _map_concurrently(chunks)
+
+    # Hierarchical Reduce: very long videos produce more summary text than one
+    # prompt should hold, so condense the summaries themselves until they fit
     combined_summaries = "\n\n".join(chunk_summaries)
+    level = 1
+    while count_tokens(combined_summaries) > REDUCE_MAX_TOKENS and len(chunk_summaries) > 1 and level < 4:
+        level += 1
+        groups = chunk_transcript_text(combined_summaries, overlap_tokens=0)
+        print(f"   Condensing {len(chunk_summaries)} summaries into {len(groups)} (level {level})...")
+        chunk_summaries = _map_concurrently(groups)
+        combined_summaries = "\n\n".join(chunk_summaries)
     
     # C. Reduce Phase (Final Report)
     reduce_prompt = ChatPromptTemplate.from_template(
@@ -177,54 +482,134 @@ def _generate_map_reduce(title, transcript, audit_log):
         Keep the tone professional.
         """
     )
-    reduce_chain = reduce_prompt | llm | StrOutputParser()
+    return reduce_prompt, {
+        "title": title,
+        "summaries": combined_summaries,
+        "audit_log": audit_log
+    }
+
+
+_rag_prompt = ChatPromptTemplate.from_template(
+    """
+    You are an intelligent video analyst. 
+    Synthesize an answer based on these transcript excerpts.
     
-    try:
-        return reduce_chain.invoke({
-            "title": title,
-            "summaries": combined_summaries,
-            "audit_log": audit_log
+    RULES:
+    1. **Connect the Dots:** Use reasoning to piece together the meaning.
+    2. **Be Direct:** Answer the question directly.
+    3. **Attribution:** Refer to the information as "the video mentions".
+    4. If excerpts are irrelevant, say "The retrieved context does not contain the answer."
+
+    USER QUESTION: {query}
+    
+    TRANSCRIPT EXCERPTS:
+    {context}
+    """
+)
+
+NO_CONTEXT_ANSWER = "I found no relevant information in the video memory to answer this."
+
+def _word_set(text: str):
+    return set(re.findall(r"\w+", text.lower()))
+
+def _join_overlapping(a: str, b: str, max_words: int = 64):
+    """Joins two neighbouring chunks, dropping the words b repeats from the end of a."""
+    a_words, b_words = a.split(), b.split()
+    for n in range(min(max_words, len(a_words), len(b_words)), 0, -1):
+        if a_words[-n:] == b_words[:n]:
+            return " ".join(a_words + b_words[n:])
+    return a + " " + b
+
+# Rough cost of the "--- EXCERPT n (title, times) ---" line
+EXCERPT_HEADER_TOKENS = 16
+
+def pack_context(chunks: list, metadatas: list = None, budget_tokens: int = None):
+    """
+    Packs retrieved chunks (best first) into a token budget for the RAG prompt.
+    - Near-duplicates (word overlap >= dedupe_similarity) are dropped
+    - The best chunks are kept until the budget is full
+    - Kept chunks from the same video that touch in time are merged, then
+      excerpts are ordered by time within each video
+    Returns (context_text, n_excerpts, tokens).
+    """
+    budget = budget_tokens or RAG_SETTINGS["context_tokens"]
+    metadatas = metadatas or [{} for _ in chunks]
+
+    kept, kept_words, used = [], [], 0
+    for rank, (text, meta) in enumerate(zip(chunks, metadatas)):
+        words = _word_set(text)
+        if any(len(words & other) / max(1, len(words | other)) >= RAG_SETTINGS["dedupe_similarity"]
+               for other in kept_words):
+            continue
+        tokens = count_tokens(text) + EXCERPT_HEADER_TOKENS
+        if used + tokens > budget:
+            continue  # A shorter, lower-ranked chunk may still fit
+        kept.append((rank, text, meta))
+        kept_words.append(words)
+        used += tokens
+
+    # Group by video (best-ranked video first), then by time within each video
+    video_rank = {}
+    for rank, _, meta in kept:
+        video_rank.setdefault(meta.get("video_id"), rank)
+    kept.sort(key=lambda k: (video_rank[k[2].get("video_id")], k[2].get("start_time", k[0])))
+
+    excerpts = []
+    for rank, text, meta in kept:
+        prev = excerpts[-1] if excerpts else None
+        if (prev and meta.get("video_id") is not None and prev["video_id"] == meta["video_id"]
+                and meta.get("start_time", 0) <= prev["end_time"] + RAG_SETTINGS["merge_gap_s"]):
+            prev["text"] = _join_overlapping(prev["text"], text)
+            prev["end_time"] = max(prev["end_time"], meta.get("end_time", 0))
+            continue
+        excerpts.append({
+            "video_id": meta.get("video_id"),
+            "title": meta.get("title"),
+            "start_time": meta.get("start_time", 0),
+            "end_time": meta.get("end_time", meta.get("start_time", 0)),
+            "text": text,
         })
-    except Exception as e:
-        return f"❌ Error in Map-Reduce generation: {e}"
 
+    parts = []
+    for i, ex in enumerate(excerpts):
+        source = f" ({ex['title']}, {ex['start_time']:.0f}s - {ex['end_time']:.0f}s)" if ex["title"] else ""
+        parts.append(f"--- EXCERPT {i+1}{source} ---\n{ex['text']}\n")
+    context_text = "".join(parts)
+    return context_text, len(excerpts), count_tokens(context_text)
 
-def answer_user_query(query: str, context_chunks: list):
+def _rag_inputs(query: str, context_chunks: list, metadatas: list = None):
+    print(f"🔍 RAG Debug - Analyzing {len(context_chunks)} chunks for query: '{query}'")
+
+    context_text, n_excerpts, tokens = pack_context(context_chunks, metadatas)
+    print(f"   📦 Packed into {n_excerpts} excerpts, {tokens} tokens (budget {RAG_SETTINGS['context_tokens']})")
+    return {"query": query, "context": context_text}
+
+def answer_user_query(query: str, context_chunks: list, metadatas: list = None):
     """
     Synthesizes an answer from retrieved vector search chunks.
+    metadatas (from search_memory) let neighbouring chunks be merged and ordered by time.
     """
     if not context_chunks:
-        return "I found no relevant information in the video memory to answer this."
+        return NO_CONTEXT_ANSWER
     
-    print(f"🔍 RAG Debug - Analyzing {len(context_chunks)} chunks for query: '{query}'")
+    try:
+        return _invoke(_rag_prompt, _rag_inputs(query, context_chunks, metadatas))
+    except Exception as e:
+        return f"I couldn't generate an answer due to an error: {e}"
 
-    context_text = ""
-    for i, chunk in enumerate(context_chunks):
-        context_text += f"--- EXCERPT {i+1} ---\n{chunk}\n"
-    
-    prompt = ChatPromptTemplate.from_template(
-        """
-        You are an intelligent video analyst. 
-        Synthesize an answer based on these transcript excerpts.
-        
-        RULES:
-        1. **Connect the Dots:** Use reasoning to piece together the meaning.
-        2. **Be Direct:** Answer the question directly.
-        3. **Attribution:** Refer to the information as "the video mentions".
-        4. If excerpts are irrelevant, say "The retrieved context does not contain the answer."
+def answer_user_query_stream(query: str, context_chunks: list, metadatas: list = None, stats: dict = None):
+    """
+    Streaming variant of answer_user_query (yields text as it arrives).
+    Errors are yielded as a message, like the blocking version returns them.
+    """
+    if not context_chunks:
+        yield NO_CONTEXT_ANSWER
+        return
 
-        USER QUESTION: {query}
-        
-        TRANSCRIPT EXCERPTS:
-        {context}
-        """
-    )
-    
-    chain = prompt | llm | StrOutputParser()
     try:
-        return chain.invoke({"query": query, "context": context_text})
+        yield from _stream(_rag_prompt, _rag_inputs(query, context_chunks, metadatas), stats)
     except Exception as e:
-        return f"I couldn't generate an answer due to an error: {e}"
+        yield f"I couldn't generate an answer due to an error: {e}"
 
 
 # Test Block
@@ -235,4 +620,5 @@ if __name__ == "__main__":
         {"start": 5.0, "end": 10.0, "text": "We expect... mumble... drop... percent.", "confidence": 0.40, "status": "⚠️ Suspicious"}
     ]
     
-    print(generate_report("Test Financial Update", mock_segments))
\ No newline at end of file
+    print(generate_report("Test Financial Update", mock_segments))
+    print(f"LLM cache: {response_cache.stats()}")
\ No newline at end of file
@@ -1,69 +1,465 @@
 #handles the "Neural Memory." It turns text into vectors and stores them.
 
-import chromadb
-from chromadb.utils import embedding_functions
-import uuid
+import sys
+import time
+import threading
+import numpy as np
+
+from components.cache import DiskCache, LRUCache, make_key
+from components.utils import get_settings
+from components.database import (
+    save_chunks, delete_chunks, delete_chunk_ids, clear_chunks, keyword_search, get_version, bump_version
+)
 
 # Setup the Local Vector DB (Persists to disk)
 CHROMA_DATA_PATH = "./voxguard_vectors"
-client = chromadb.PersistentClient(path=CHROMA_DATA_PATH)
 
 # 'all-MiniLM-L6-v2' is free and the industry standard for fast, local embeddings
-emb_fn = embedding_functions.SentenceTransformerEmbeddingFunction(
-    model_name="all-MiniLM-L6-v2"
-)
+EMBEDDING_SETTINGS = get_settings("embedding")
 
-# Create (or get) the collection
-collection = client.get_or_create_collection(
-    name="video_segments",
-    embedding_function=emb_fn
+# Text -> vector cache: "Thank you.", "[Music]" and friends are embedded once, ever
+embedding_cache = DiskCache(
+    EMBEDDING_SETTINGS["cache_path"],
+    max_entries=EMBEDDING_SETTINGS["cache_max_entries"],
 )
 
-def vector_store_segments(video_id: str, title: str, segments: list):
+# Hot-path Neural Search caches: repeated queries (Streamlit reruns, several
+# users asking the same thing) skip both the embedding and the index lookups.
+# Results are keyed by the "vectors" version, which every write bumps.
+SEARCH_SETTINGS = get_settings("search")
+query_embedding_cache = LRUCache(SEARCH_SETTINGS["embedding_cache_size"])
+search_result_cache = LRUCache(SEARCH_SETTINGS["result_cache_size"])
+
+# The Chroma client and the embedding model are created on first use, so
+# importing this module (dashboard, monitor) costs no model load or DB open
+_embedder = None
+_collection = None
+_embedder_lock = threading.Lock()
+_collection_lock = threading.Lock()
+
+def get_embedder():
+    """Returns the shared SentenceTransformer, loading it on first use."""
+    global _embedder
+    with _embedder_lock:
+        if _embedder is None:
+            import torch
+            from sentence_transformers import SentenceTransformer
+            if EMBEDDING_SETTINGS["threads"]:
+                torch.set_num_threads(int(EMBEDDING_SETTINGS["threads"]))
+            _embedder = SentenceTransformer(EMBEDDING_SETTINGS["model"])
+    return _embedder
+
+def _embed(texts: list):
+    """
+    Embeds texts in configurable batches, skipping every text already in the
+    cache (and repeats within the call). Returns (vectors, n_unique, n_embedded).
+    """
+    model_name = EMBEDDING_SETTINGS["model"]
+    keys = [make_key(model_name, text) for text in texts]
+    unique = dict(zip(keys, texts))
+
+    vectors = {
+        key: np.frombuffer(blob, dtype=np.float32)
+        for key, blob in embedding_cache.get_many(list(unique)).items()
+    }
+    missing = [key for key in unique if key not in vectors]
+    if missing:
+        fresh = get_embedder().encode(
+            [unique[key] for key in missing],
+            batch_size=int(EMBEDDING_SETTINGS["batch_size"]),
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        ).astype(np.float32)
+        vectors.update(zip(missing, fresh))
+        embedding_cache.set_many({key: vec.tobytes() for key, vec in zip(missing, fresh)})
+
+    if not keys:
+        return np.empty((0, get_embedder().get_sentence_embedding_dimension()), dtype=np.float32), 0, 0
+    return np.stack([vectors[key] for key in keys]), len(unique), len(missing)
+
+def embed_texts(texts: list):
+    """Cached, batched embeddings as a float32 array of shape (n, dim)."""
+    return _embed(list(texts))[0]
+
+def get_collection():
+    """Returns the Chroma collection, opening the persistent client on first use."""
+    global _collection
+    with _collection_lock:
+        if _collection is None:
+            import chromadb
+            from chromadb import Documents, EmbeddingFunction, Embeddings
+
+            class CachedEmbeddingFunction(EmbeddingFunction):
+                # Same model as the vectors already on disk, routed through the cache,
+                # so Chroma's own query_texts embedding benefits from it too
+                def __call__(self, input: Documents) -> Embeddings:
+                    return embed_texts(input).tolist()
+
+            client = chromadb.PersistentClient(path=CHROMA_DATA_PATH)
+            # Create (or get) the collection
+            _collection = client.get_or_create_collection(
+                name="video_segments",
+                embedding_function=CachedEmbeddingFunction()
+            )
+    return _collection
+
+def _make_chunk(group: list):
+    # Window metadata: full time span, the worst trust score inside it
+    return {
+        "text": " ".join(seg['text'].strip() for seg in group),
+        "start": group[0]['start'],
+        "end": group[-1]['end'],
+        "speaker": group[0].get('speaker', "Speaker ??"),
+        "confidence": min(seg['confidence'] for seg in group),
+        "trust_score": min(seg.get('trust_score', seg['confidence']) for seg in group),
+        "is_flagged": any(seg['status'] == "⚠️ Suspicious" for seg in group),
+        "segments": len(group),
+    }
+
+def chunk_segments(segments: list, max_tokens: int = None, overlap_tokens: int = None):
     """
-    Stores each verified transcript segment into the Vector DB.
-    Allows for semantic searching later.
+    Merges consecutive same-speaker segments into retrieval windows of at most
+    max_tokens (embedder tokens), carrying the last ~overlap_tokens of a window
+    into the next one. A speaker change always starts a fresh window, and a
+    single segment longer than max_tokens stays whole (the embedder truncates it).
     """
-    print(f"🧠 Vectorizing {len(segments)} memory segments...")
+    max_tokens = max_tokens or int(EMBEDDING_SETTINGS["chunk_tokens"])
+    overlap_tokens = int(EMBEDDING_SETTINGS["chunk_overlap_tokens"]) if overlap_tokens is None else overlap_tokens
+    if not segments:
+        return []
+
+    # One batched tokenizer call for every segment
+    token_ids = get_embedder().tokenizer([seg['text'] for seg in segments], add_special_tokens=False)["input_ids"]
+    lengths = [len(ids) for ids in token_ids]
+
+    chunks = []
+    window = []  # indices into segments
+    window_tokens = 0
+    for i, seg in enumerate(segments):
+        if window:
+            speaker_changed = segments[window[-1]].get('speaker') != seg.get('speaker')
+            if speaker_changed or window_tokens + lengths[i] > max_tokens:
+                chunks.append(_make_chunk([segments[j] for j in window]))
+                carry = []
+                carried = 0
+                if not speaker_changed:
+                    # Overlap = trailing segments of the closed window (never all of it,
+                    # and never so many that the new segment no longer fits)
+                    for j in reversed(window[1:]):
+                        if carried + lengths[j] > overlap_tokens or carried + lengths[j] + lengths[i] > max_tokens:
+                            break
+                        carry.insert(0, j)
+                        carried += lengths[j]
+                window, window_tokens = carry, carried
+        window.append(i)
+        window_tokens += lengths[i]
+
+    chunks.append(_make_chunk([segments[j] for j in window]))
+    return chunks
+
+# Pages of this size are pulled from Chroma when scanning the whole collection
+COMPACT_PAGE_SIZE = 5000
+
+def segment_id(video_id: str, start: float) -> str:
+    """
+    Deterministic ID for a segment: the same video and start time always map
+    to the same vector, so reprocessing overwrites instead of duplicating.
+    """
+    return f"{video_id}_{int(round(start * 1000)):010d}"
+
+def delete_video_vectors(video_id: str):
+    """Removes every vector (and keyword-index entry) of one video. Returns True on success."""
+    try:
+        get_collection().delete(where={"video_id": video_id})
+        bump_version("vectors")
+        return delete_chunks(video_id)
+    except Exception as e:
+        print(f"❌ Vector Delete Error: {e}")
+        return False
+
+def vector_store_segments(video_id: str, title: str, segments: list, replace: bool = False):
+    """
+    Stores the verified transcript segments into the Vector DB, merged into
+    retrieval windows by chunk_segments(). Allows for semantic searching later.
+    Returns True on success.
+    Writes are upserts keyed by segment_id(); replace=True first drops the
+    video's old vectors (a full reprocess may shift segment boundaries).
+    """
+    if not segments:
+        return True
+    chunks = chunk_segments(segments)
+    print(f"🧠 Vectorizing {len(segments)} memory segments as {len(chunks)} chunks...")
+
+    if replace and not delete_video_vectors(video_id):
+        return False
     
     ids = []
     documents = []
     metadatas = []
+    seen = {}
+    indexed_at = time.time()
 
-    for seg in segments:
+    for chunk in chunks:
         # We only store segments that are NOT suspicious to keep the "Brain" clean?
         # OR we store everything but tag the quality. Let's tag them.
         
-        # Create a unique ID for this snippet
-        chunk_id = f"{video_id}_{str(uuid.uuid4())[:8]}"
+        # Same video + start time -> same ID (a repeated start in one batch gets a suffix)
+        chunk_id = segment_id(video_id, chunk['start'])
+        seen[chunk_id] = seen.get(chunk_id, 0) + 1
+        if seen[chunk_id] > 1:
+            chunk_id = f"{chunk_id}_{seen[chunk_id] - 1}"
         
         ids.append(chunk_id)
-        documents.append(seg['text'])
+        documents.append(chunk['text'])
         metadatas.append({
             "video_id": video_id,
             "title": title,
-            "start_time": seg['start'],
-            "confidence": seg['confidence'],
-            "is_flagged": True if seg['status'] == "⚠️ Suspicious" else False
+            "start_time": chunk['start'],
+            "end_time": chunk['end'],
+            "speaker": chunk['speaker'],
+            "confidence": chunk['confidence'],
+            "trust_score": chunk['trust_score'],
+            "is_flagged": chunk['is_flagged'],
+            "segments": chunk['segments'],
+            "indexed_at": indexed_at,
         })
 
-    # Add to ChromaDB in one batch
+    # Upsert into ChromaDB in one batch (embedded by us, so only unique text costs anything)
     try:
-        collection.add(
+        embed_start = time.perf_counter()
+        embeddings, n_unique, n_embedded = _embed(documents)
+        embed_time = time.perf_counter() - embed_start
+        rate = len(segments) / embed_time if embed_time > 0 else float("inf")
+        print(f"   ⚡ Embedded {len(segments)} segments ({len(documents)} chunks) in {embed_time:.2f}s ({rate:.0f} seg/s) | "
+              f"{n_unique} unique texts, {n_embedded} new, {n_unique - n_embedded} from cache")
+
+        get_collection().upsert(
             ids=ids,
+            embeddings=embeddings.tolist(),
             documents=documents,
             metadatas=metadatas
         )
-        print(f"✅ Indexed {len(segments)} segments into Vector Memory.")
+        # Same chunks into the SQLite keyword index (hybrid search)
+        if not save_chunks([
+            {"chunk_id": chunk_id, "text": doc, **meta}
+            for chunk_id, doc, meta in zip(ids, documents, metadatas)
+        ]):
+            return False
+        bump_version("vectors")  # Cached search results are now stale
+        print(f"✅ Indexed {len(segments)} segments ({len(chunks)} chunks) into Vector Memory.")
+        return True
     except Exception as e:
         print(f"❌ Vector Storage Error: {e}")
+        return False
 
 def query_memory(query_text: str, n_results=5):
     """
     Search the agent's brain for similar concepts.
     """
-    results = collection.query(
+    results = get_collection().query(
         query_texts=[query_text],
         n_results=n_results
     )
-    return results
\ No newline at end of file
+    return results
+
+# Reciprocal-rank fusion constant (the usual 60: dampens the head of each list)
+RRF_K = 60
+# Each retriever contributes this many candidates per requested result
+CANDIDATE_MULTIPLIER = 4
+
+def build_where(filters: dict):
+    """
+    Chroma `where` clause for the search filters, so they are applied inside
+    the index instead of after it:
+    video_id (str or list), exclude_flagged, min_confidence, indexed_after, indexed_before.
+    """
+    filters = filters or {}
+    conditions = []
+    video_ids = filters.get("video_id")
+    if video_ids:
+        if isinstance(video_ids, str):
+            conditions.append({"video_id": video_ids})
+        else:
+            conditions.append({"video_id": {"$in": list(video_ids)}})
+    if filters.get("exclude_flagged"):
+        conditions.append({"is_flagged": False})
+    if filters.get("min_confidence") is not None:
+        conditions.append({"confidence": {"$gte": float(filters["min_confidence"])}})
+    if filters.get("indexed_after") is not None:
+        conditions.append({"indexed_at": {"$gte": float(filters["indexed_after"])}})
+    if filters.get("indexed_before") is not None:
+        conditions.append({"indexed_at": {"$lte": float(filters["indexed_before"])}})
+
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+def search_memory(query_text: str, n_results: int = 5, filters: dict = None):
+    """
+    Hybrid Neural Search: vector similarity (Chroma) + BM25 keywords (SQLite
+    FTS5), fused by reciprocal rank, with the same filters pushed into both.
+    Returns {"ids", "documents", "metadatas", "scores", "timings"} (flat lists,
+    best first; timings in seconds per stage).
+    """
+    timings = {}
+    n_candidates = n_results * CANDIDATE_MULTIPLIER
+
+    started = time.perf_counter()
+    result_key = make_key(query_text, n_results, filters or {}, get_version("vectors"))
+    cached = search_result_cache.get(result_key)
+    if cached is not None:
+        timings["cache"] = time.perf_counter() - started
+        print(f"⚡ Search cache hit for '{query_text[:40]}' ({timings['cache'] * 1000:.1f}ms)")
+        return {**cached, "timings": timings}
+
+    query_embedding = query_embedding_cache.get(query_text)
+    if query_embedding is None:
+        query_embedding = embed_texts([query_text])
+        query_embedding_cache.set(query_text, query_embedding)
+    timings["embed"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    collection = get_collection()
+    vector = collection.query(
+        query_embeddings=query_embedding.tolist(),
+        n_results=max(1, min(n_candidates, collection.count())),
+        where=build_where(filters),
+    )
+    timings["vector"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    keyword = keyword_search(query_text, limit=n_candidates, filters=filters)
+    timings["keyword"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    scores = {}
+    found = {}
+    vector_ids = vector["ids"][0] if vector["ids"] else []
+    for rank, (chunk_id, doc, meta) in enumerate(zip(vector_ids, vector["documents"][0], vector["metadatas"][0])):
+        scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+        found[chunk_id] = (doc, meta)
+    for rank, row in enumerate(keyword):
+        chunk_id = row["chunk_id"]
+        scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+        if chunk_id not in found:
+            meta = {k: v for k, v in row.items() if k not in ("chunk_id", "text", "rank")}
+            found[chunk_id] = (row["text"], meta)
+
+    top = sorted(scores, key=scores.get, reverse=True)[:n_results]
+    timings["fusion"] = time.perf_counter() - started
+    timings["total"] = sum(timings.values())
+
+    print(f"🔍 Search '{query_text[:40]}': {len(vector_ids)} vector + {len(keyword)} keyword hits | "
+          + " | ".join(f"{stage} {seconds * 1000:.0f}ms" for stage, seconds in timings.items()))
+    results = {
+        "ids": top,
+        "documents": [found[chunk_id][0] for chunk_id in top],
+        "metadatas": [found[chunk_id][1] for chunk_id in top],
+        "scores": [scores[chunk_id] for chunk_id in top],
+    }
+    search_result_cache.set(result_key, results)
+    return {**results, "timings": timings}
+
+def search_cache_stats():
+    """Hit/miss counts and hit rates of the query-embedding and result caches."""
+    return {
+        "query_embeddings": query_embedding_cache.stats(),
+        "results": search_result_cache.stats(),
+    }
+
+def _is_deterministic(chunk_id: str, key: str):
+    """True if chunk_id is key itself or one of its numbered variants (key_1, key_2...)."""
+    suffix = chunk_id[len(key) + 1:]
+    return chunk_id == key or (chunk_id.startswith(key + "_") and suffix.isdigit())
+
+def compact_memory():
+    """
+    One-off cleanup for collections written before IDs were deterministic:
+    keeps one vector per (video, start time, text) under a segment_id()-based ID
+    and deletes the duplicates. Returns the number of vectors removed.
+    A text that already sits under a deterministic ID stays there; other texts
+    are re-homed under a free suffix, so no existing vector is ever overwritten.
+    """
+    collection = get_collection()
+    total = collection.count()
+    print(f"🧹 Compacting {total} vectors...")
+
+    # segment_id -> {text: [ids holding that text]}
+    groups = {}
+    taken = set()
+    for offset in range(0, total, COMPACT_PAGE_SIZE):
+        page = collection.get(include=["metadatas", "documents"], limit=COMPACT_PAGE_SIZE, offset=offset)
+        for chunk_id, meta, text in zip(page["ids"], page["metadatas"], page["documents"]):
+            key = segment_id(meta["video_id"], meta["start_time"])
+            groups.setdefault(key, {}).setdefault(text, []).append(chunk_id)
+            taken.add(chunk_id)
+
+    duplicates = []
+    rehomed = []  # keyword-index rows for the re-homed vectors
+    for key, texts in groups.items():
+        homeless = []
+        for ids in texts.values():
+            keepers = [i for i in ids if _is_deterministic(i, key)]
+            if keepers:
+                duplicates.extend(i for i in ids if i != keepers[0])
+            else:
+                homeless.append(ids)
+
+        n = 0
+        for ids in homeless:
+            # Next ID of the vector_store_segments naming that nothing holds yet
+            while (key if n == 0 else f"{key}_{n}") in taken:
+                n += 1
+            canonical = key if n == 0 else f"{key}_{n}"
+            taken.add(canonical)
+            # Re-home the first copy under it (reusing its embedding)
+            keeper = collection.get(ids=[ids[0]], include=["embeddings", "documents", "metadatas"])
+            collection.upsert(
+                ids=[canonical],
+                embeddings=keeper["embeddings"],
+                documents=keeper["documents"],
+                metadatas=keeper["metadatas"],
+            )
+            rehomed.append({"chunk_id": canonical, "text": keeper["documents"][0], **keeper["metadatas"][0]})
+            duplicates.extend(ids)
+
+    for i in range(0, len(duplicates), COMPACT_PAGE_SIZE):
+        collection.delete(ids=duplicates[i:i + COMPACT_PAGE_SIZE])
+    # Mirror the same changes in the keyword index
+    delete_chunk_ids(duplicates)
+    save_chunks(rehomed)
+
+    bump_version("vectors")
+    removed = total - collection.count()
+    print(f"✅ Removed {removed} duplicate vectors ({collection.count()} remain).")
+    return removed
+
+def rebuild_keyword_index():
+    """
+    Rebuilds the keyword index from scratch out of every chunk in Chroma
+    (for collections built before it existed, or after it drifted).
+    """
+    collection = get_collection()
+    total = collection.count()
+    print(f"🔤 Rebuilding keyword index from {total} vectors...")
+    clear_chunks()
+    for offset in range(0, total, COMPACT_PAGE_SIZE):
+        page = collection.get(include=["metadatas", "documents"], limit=COMPACT_PAGE_SIZE, offset=offset)
+        save_chunks([
+            {"chunk_id": chunk_id, "text": doc, **meta}
+            for chunk_id, doc, meta in zip(page["ids"], page["documents"], page["metadatas"])
+        ])
+    bump_version("vectors")  # Cached search results may have come from stale rows
+    print("✅ Keyword index rebuilt.")
+
+# Maintenance entry points:
+#   python -m components.memory --compact            remove duplicate vectors
+#   python -m components.memory --reindex-keywords   backfill the keyword index
+if __name__ == "__main__":
+    if "--compact" in sys.argv:
+        compact_memory()
+    if "--reindex-keywords" in sys.argv:
+        rebuild_keyword_index()
+    if "--compact" not in sys.argv and "--reindex-keywords" not in sys.argv:
+        collection = get_collection()
+        print(f"🧠 {collection.count()} vectors in '{collection.name}'. Use --compact / --reindex-keywords for maintenance.")
\ No newline at end of file
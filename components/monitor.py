@@ -1,19 +1,25 @@
+import os
 import time
+import multiprocessing
 import schedule
 import yt_dlp
-from components.database import get_video_by_id
-from components.utils import load_config
-from main import run_voxguard
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from components.database import get_video_by_id, get_unfinished_videos, record_stage
+from components.utils import load_config, get_settings
+from components.perception import get_engine
+from main import ingest, perceive, finalize
 
-def check_feeds():
-    config = load_config()
-    channels = config.get("channels", [])
-    
-    if not channels:
-        print("📭 No channels configured.")
-        return
+# The perception pool outlives a single scan so its workers keep their loaded models
+_perception_pool = None
+_perception_pool_size = None
 
-    print(f"\n📡 Executing Deep Scan on {len(channels)} channels...")
+def _scan_channel(channel_id: str):
+    """Returns [(video_id, title, url), ...] for the new uploads on one channel."""
+    clean_id = channel_id.strip()
+    channel_url = f"https://www.youtube.com/channel/{clean_id}/videos"
+
+    print(f"   🔎 Scanning: {clean_id}...")
 
     # Configure yt-dlp to just "look" at the playlist, not download
     ydl_opts = {
@@ -23,50 +29,186 @@ def check_feeds():
         'ignoreerrors': True,  # Don't crash on private videos
     }
 
-    for channel_id in channels:
-        clean_id = channel_id.strip()
-        channel_url = f"https://www.youtube.com/channel/{clean_id}/videos"
-        
-        print(f"   🔎 Scanning: {clean_id}...")
-
-        try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                # This fetches the JSON metadata of the channel page
-                info = ydl.extract_info(channel_url, download=False)
-                
-                if not info or 'entries' not in info:
-                    print(f"     ⚠️ No videos found. Channel ID might be invalid.")
+    new_videos = []
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            # This fetches the JSON metadata of the channel page
+            info = ydl.extract_info(channel_url, download=False)
+
+            if not info or 'entries' not in info:
+                print(f"     ⚠️ No videos found. Channel ID might be invalid.")
+                return []
+
+            # Getting the entries (yt-dlp gives them Newest -> Oldest)
+            recent_videos = list(info['entries'])
+
+            # Oldest -> Newest chronology
+            for entry in reversed(recent_videos):
+                if not entry:
+                    continue
+                # yt-dlp flat extraction keys are slightly different
+                video_id = entry.get('id')
+                title = entry.get('title')
+                video_url = entry.get('url') or f"https://www.youtube.com/watch?v={video_id}"
+
+                if not video_id:
+                    continue
+
+                # DUPLICATE CHECK
+                if not get_video_by_id(video_id):
+                    print(f"     [NEW] 🚨 Found: {title}")
+                    new_videos.append((video_id, title, video_url))
+
+    except Exception as e:
+        print(f"   ❌ Monitor Error: {e}")
+
+    return new_videos
+
+def _init_perception_worker(cpu_threads: int):
+    # Runs once per perception process: split the cores between workers and
+    # load + warm the models so every job in this process reuses them
+    import torch
+    torch.set_num_threads(cpu_threads)
+    get_engine(warm_up=True)
+
+def _perceive_job(audio_path: str, video_id: str, video_title: str):
+    # Audio work only: vectorizing/summarizing happen on the LLM pool.
+    # perception.streaming = true goes window-by-window to bound worker memory
+    # (at the cost of per-window speaker labels, see PerceptionEngine.iter_segments)
+    streaming = bool(get_settings("perception")["streaming"])
+    segments, _, _ = perceive(audio_path, video_id, video_title, streaming=streaming, overlap_downstream=False)
+    return segments
+
+def _get_perception_pool(size: int):
+    global _perception_pool, _perception_pool_size
+    if _perception_pool is None or _perception_pool_size != size:
+        if _perception_pool is not None:
+            _perception_pool.shutdown()
+        cpu_threads = max(1, (os.cpu_count() or 1) // size)
+        # 'spawn' keeps the model-loading processes independent of our threads
+        _perception_pool = ProcessPoolExecutor(
+            max_workers=size,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_perception_worker,
+            initargs=(cpu_threads,),
+        )
+        _perception_pool_size = size
+    return _perception_pool
+
+def _discard_perception_pool(pool, video_id: str, error):
+    """
+    A worker died (OOM on a long file) or the model-loading initializer failed:
+    the pool is unusable. Drop it so the next submit builds a fresh one, and
+    mark the video's perception as failed so the next scan retries it.
+    (Other jobs of the same broken pool land here too; they leave any newer pool alone.)
+    """
+    global _perception_pool, _perception_pool_size
+    print(f"   ❌ Perception failed for {video_id}, worker pool broken: {error}")
+    if _perception_pool is pool:
+        pool.shutdown(wait=False, cancel_futures=True)
+        _perception_pool = None
+        _perception_pool_size = None
+    record_stage(video_id, "perception", "failed", error=f"perception worker died: {error}")
+
+def _run_pipeline(new_videos: list, workers: dict):
+    """
+    Pushes every new video through download -> perception -> LLM, each stage on
+    its own pool, so downloads, transcription and report writing overlap.
+    Returns the number of videos fully processed.
+    """
+    download_pool = ThreadPoolExecutor(max_workers=int(workers["download"]))
+    perception_size = max(1, int(workers["perception"]))
+    llm_pool = ThreadPoolExecutor(max_workers=int(workers["llm"]))
+
+    pending = {download_pool.submit(ingest, url): ("download", url, None) for _, _, url in new_videos}
+    completed = 0
+    job_pools = {}  # perception job -> the pool it runs on
+
+    try:
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, url, ingested = pending.pop(future)
+                try:
+                    result = future.result()
+                except BrokenProcessPool as e:
+                    _discard_perception_pool(job_pools.pop(future), ingested[2], e)
                     continue
-                
-                # Getting the entries (yt-dlp gives them Newest -> Oldest)
-                recent_videos = list(info['entries'])
-
-                # Oldest -> Newest chronology
-                for entry in reversed(recent_videos):
-                    # yt-dlp flat extraction keys are slightly different
-                    video_id = entry.get('id')
-                    title = entry.get('title')
-                    video_url = entry.get('url') or f"https://www.youtube.com/watch?v={video_id}"
-
-                    if not video_id: 
+                except Exception as e:
+                    print(f"   ❌ Pipeline failed at {stage} for {url}: {e}")
+                    continue
+
+                if stage == "download":
+                    if not result:
+                        continue  # Download failed or video already known
+                    audio_path, video_title, video_id = result
+                    perception_pool = _get_perception_pool(perception_size)
+                    try:
+                        job = perception_pool.submit(_perceive_job, audio_path, video_id, video_title)
+                    except BrokenProcessPool as e:
+                        _discard_perception_pool(perception_pool, video_id, e)
                         continue
+                    job_pools[job] = perception_pool
+                    pending[job] = ("perception", url, result)
+
+                elif stage == "perception":
+                    job_pools.pop(future, None)
+                    _, video_title, video_id = ingested
+                    job = llm_pool.submit(finalize, url, video_title, video_id, result)
+                    pending[job] = ("llm", url, ingested)
+
+                elif result:
+                    completed += 1
+                    print(f"     ✅ Done: {ingested[1]}")
+    finally:
+        download_pool.shutdown()
+        llm_pool.shutdown()
+
+    return completed
+
+def check_feeds():
+    config = load_config()
+    channels = config.get("channels", [])
 
-                    # DUPLICATE CHECK
-                    if get_video_by_id(video_id):
-                        # print(f"     [SKIP] {title[:20]}...")
-                        pass
-                    else:
-                        print(f"     [NEW] 🚨 Found: {title}")
-                        print(f"     Triggering Pipeline...")
-                        
-                        run_voxguard(video_url)
-                        
-                        print("     ✅ Done.")
-                        # Sleep briefly to be polite
-                        time.sleep(5)
-
-        except Exception as e:
-            print(f"   ❌ Monitor Error: {e}")
+    if not channels:
+        print("📭 No channels configured.")
+        return
+
+    workers = get_settings("workers")
+    print(f"\n📡 Executing Deep Scan on {len(channels)} channels...")
+    scan_start = time.perf_counter()
+
+    # Channel scans are pure network I/O: run them side by side
+    with ThreadPoolExecutor(max_workers=int(workers["scan"])) as scan_pool:
+        scans = list(scan_pool.map(_scan_channel, channels))
+
+    # The same upload can show up on more than one channel page
+    new_videos = []
+    seen = set()
+    for channel_videos in scans:
+        for video in channel_videos:
+            if video[0] not in seen:
+                seen.add(video[0])
+                new_videos.append(video)
+
+    # Videos whose pipeline failed last time: rerunning resumes at the failed stage
+    for video_id, url in get_unfinished_videos():
+        if video_id not in seen:
+            print(f"     [RETRY] ♻️ Resuming: {video_id}")
+            seen.add(video_id)
+            new_videos.append((video_id, None, url))
+
+    if not new_videos:
+        print("   No new uploads.")
+        return
+
+    print(f"     Triggering Pipeline for {len(new_videos)} videos "
+          f"(download x{workers['download']}, perception x{workers['perception']}, llm x{workers['llm']})...")
+    completed = _run_pipeline(new_videos, workers)
+
+    elapsed = time.perf_counter() - scan_start
+    rate = completed / (elapsed / 3600) if elapsed > 0 else 0.0
+    print(f"📊 Processed {completed}/{len(new_videos)} videos in {elapsed / 60:.1f} min ({rate:.1f} videos/hour)")
 
 def start_scheduler():
     print("="*50)
@@ -74,13 +216,14 @@ def start_scheduler():
     print("   Engine: yt-dlp (Bulletproof)")
     print("   Schedule: Every 6 Hours")
     print("="*50)
-    
+
+    # Models are loaded (and warmed up) inside each perception worker process
     check_feeds()
     schedule.every(6).hours.do(check_feeds)
-    
+
     while True:
         schedule.run_pending()
         time.sleep(60)
 
 if __name__ == "__main__":
-    start_scheduler()
\ No newline at end of file
+    start_scheduler()
@@ -54,6 +54,7 @@ def markdown_to_html(text):
 def send_alert(subject: str, markdown_body: str, video_title: str = None, video_url: str = None, dry_run: bool = False):
     """
     Sends the Intelligence Report via Email (Clean HTML formatting).
+    Returns True once the report was delivered (or saved locally).
     """
     # Load user configuration
     config = load_config()
@@ -95,7 +96,7 @@ def send_alert(subject: str, markdown_body: str, video_title: str = None, video_
         with open(filename, "w", encoding="utf-8") as f:
             f.write(html_body)
         print(f"⚠️ Email Config Missing or Dry Run. Saved locally: {filename}")
-        return
+        return True
 
     # Send Email
     try:
@@ -112,6 +113,8 @@ def send_alert(subject: str, markdown_body: str, video_title: str = None, video_
         server.quit()
         
         print(f"✅ Email sent successfully to {receiver_email}")
+        return True
         
     except Exception as e:
         print(f"❌ Failed to send email: {e}")
+        return False
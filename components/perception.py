@@ -1,33 +1,210 @@
 import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-import librosa
-from faster_whisper import WhisperModel
-import torch
-import torchaudio
-from pyannote.audio import Pipeline
-from pyannote.core import Segment 
 from dotenv import load_dotenv
-from huggingface_hub import login
+
+from components.signals import (
+    assign_speakers, diarization_to_arrays, segment_means, score_segments,
+    speech_regions, compact_audio, remap_times, plan_windows, TRUST_SCORERS
+)
+from components.utils import get_settings
 
 load_dotenv()
 
+# NOTE: librosa, torch, pyannote and faster-whisper are imported where they are
+# used (they take seconds to import), so the dashboard and the monitor can
+# import this module without paying for them until audio is processed.
+
 #configuration
 HF_TOKEN = os.getenv("HF_TOKEN")
 if not HF_TOKEN:
     print("⚠️ WARNING: HF_TOKEN is missing in .env file! Diarization will fail.")
 
-MODEL_SIZE = "tiny"
-COMPUTE_TYPE = "int8"
+# Every stage (RMS, Pyannote, Whisper) consumes 16 kHz mono float32
+SAMPLE_RATE = 16000
+HOP_LENGTH = 512  # librosa's default RMS hop, used to map seconds -> frames
+
+# Streaming mode (iter_segments): each window is decoded/analyzed on its own.
+# The overlap gives Whisper context at the cut points (>= one 30s Whisper segment).
+STREAM_WINDOW_S = 600.0
+STREAM_OVERLAP_S = 30.0
+
+
+def _current_rss_mb():
+    """Current resident memory of this process in MB (None where /proc isn't available)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class RunPeakRSS:
+    """
+    Samples RSS in the background while a run is active, so the reported peak
+    belongs to this run (ru_maxrss is the whole process lifetime, which in the
+    long-lived monitor/dashboard means "highest of any earlier run").
+    RSS is process-wide: runs overlapping in other threads are included.
+    .peak_mb is None where RSS can't be read (e.g. Windows, macOS).
+    """
+    def __init__(self, interval_s: float = 0.05):
+        self.interval_s = interval_s
+        self.peak_mb = None
+        self._stop = threading.Event()
+
+    def _sample(self):
+        rss = _current_rss_mb()
+        if rss is not None:
+            self.peak_mb = rss if self.peak_mb is None else max(self.peak_mb, rss)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval_s):
+            self._sample()
+
+    def start(self):
+        self._sample()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops sampling; returns the run's peak in MB (or None)."""
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        return self.peak_mb
+
+
+# Frames decoded per block when streaming a file into a memory map (~1 min)
+MMAP_BLOCK_FRAMES = SAMPLE_RATE * 60
+
+
+def load_waveform(audio_path: str, mmap: bool = False):
+    """
+    Decodes the audio file ONCE into a 16 kHz mono float32 buffer.
+    With mmap=True the file is decoded block by block straight into a .npy
+    next to the audio and memory-mapped back, so the full buffer never sits in
+    RAM (the OS pages it in as the stages read it). Returns (waveform, cache_path or None).
+    """
+    if mmap:
+        mapped = _decode_to_memmap(audio_path)
+        if mapped is not None:
+            return mapped
+    import librosa
+    y, _ = librosa.load(audio_path, sr=SAMPLE_RATE, mono=True, dtype=np.float32)
+    return y, None
+
+
+def _decode_to_memmap(audio_path: str):
+    """
+    Streams soundfile blocks into an on-disk float32 array.
+    Only for files already at 16 kHz (what ingestion writes); returns None
+    for anything that needs resampling or that libsndfile can't read, and the
+    caller decodes in RAM instead.
+    """
+    import soundfile as sf
+    try:
+        audio = sf.SoundFile(audio_path)
+    except Exception as e:
+        print(f"   ⚠️ Can't stream-decode {os.path.basename(audio_path)} ({e}), decoding in RAM.")
+        return None
+
+    cache_path = os.path.splitext(audio_path)[0] + ".16k.npy"
+    with audio:
+        if audio.samplerate != SAMPLE_RATE:
+            print(f"   ⚠️ {audio.samplerate} Hz audio needs resampling, decoding in RAM.")
+            return None
+        out = np.lib.format.open_memmap(cache_path, mode="w+", dtype=np.float32, shape=(audio.frames,))
+        written = 0
+        for block in audio.blocks(blocksize=MMAP_BLOCK_FRAMES, dtype="float32", always_2d=True):
+            n = min(len(block), audio.frames - written)
+            out[written:written + n] = block[:n].mean(axis=1)
+            written += n
+        out.flush()
+        del out
+    # Copy-on-write mapping: writable views for torch, file stays untouched
+    return np.load(cache_path, mmap_mode="c")[:written], cache_path
+
+
+def get_audio_duration(audio_path: str) -> float:
+    """Duration in seconds, read from the file header (no full decode)."""
+    import librosa
+    return librosa.get_duration(path=audio_path)
+
+
+# Process-wide engine registry
+# Loading Whisper + Pyannote takes seconds (and a HF login); do it once per
+# (model size, compute type) and share the engine across CLI, monitor and dashboard.
+_engines = {}
+_engines_lock = threading.Lock()
+_hf_logged_in = False
+
+
+def _hf_login():
+    global _hf_logged_in
+    if HF_TOKEN and not _hf_logged_in:
+        from huggingface_hub import login
+        login(token=HF_TOKEN)
+        _hf_logged_in = True
+
+
+def get_engine(model_size: str = None, compute_type: str = None, warm_up: bool = False):
+    """
+    Returns the shared PerceptionEngine for this configuration, loading it on first use.
+    Model size and compute type default to the "perception" section of config.json.
+    """
+    settings = get_settings("perception")
+    model_size = model_size or settings["model_size"]
+    compute_type = compute_type or settings["compute_type"]
+    key = (model_size, compute_type)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = PerceptionEngine(model_size, compute_type)
+            _engines[key] = engine
+            if warm_up:
+                engine.warm_up()
+    return engine
 
 
 class PerceptionEngine:
-    def __init__(self):
-        print(f"Loading Whisper model ({MODEL_SIZE}) & Pyannote Speaker Diarization...")
-        self.model = WhisperModel(MODEL_SIZE, device="cpu", compute_type=COMPUTE_TYPE)
+    def __init__(self, model_size: str = None, compute_type: str = None):
+        load_start = time.perf_counter()
+        import torch
+        from faster_whisper import WhisperModel
+        from pyannote.audio import Pipeline
+
+        # Trust scorers (components.signals.TRUST_SCORERS), VAD and decoding options
+        self.settings = get_settings("perception")
+        self.trust_scorers = self.settings["trust_scorers"]
+        # Fail now, not after a full diarization + decode (e.g. a typo like "cliping")
+        unknown = [name for name in self.trust_scorers if name not in TRUST_SCORERS]
+        if unknown:
+            raise ValueError(
+                f"Unknown perception.trust_scorers {unknown}; available: {sorted(TRUST_SCORERS)}"
+            )
+        self.model_size = model_size or self.settings["model_size"]
+        self.compute_type = compute_type or self.settings["compute_type"]
+
+        # num_workers > 1 lets several threads call transcribe() truly in parallel;
+        # cpu_threads is per worker (0 = split torch's thread budget between them,
+        # which the monitor already narrows per perception process)
+        self.num_workers = max(1, int(self.settings["num_workers"]))
+        cpu_threads = int(self.settings["cpu_threads"]) or max(1, torch.get_num_threads() // self.num_workers)
 
-        # HuggingFace login
-        if HF_TOKEN:
-            login(token=HF_TOKEN)
+        print(f"Loading Whisper model ({self.model_size}) & Pyannote Speaker Diarization...")
+        self.model = WhisperModel(
+            self.model_size,
+            device=self.settings["device"],
+            compute_type=self.compute_type,
+            cpu_threads=cpu_threads,
+            num_workers=self.num_workers,
+        )
+
+        # HuggingFace login (once per process, not once per engine)
+        _hf_login()
 
         # Load Diarization (Speaker ID)
         try:
@@ -42,42 +219,278 @@ class PerceptionEngine:
             print(f"⚠️ Diarization Pipeline failed to load: {e}")
             self.diarization_pipeline = None
 
+        # Pyannote pipelines are not thread-safe; serialize runs on a shared engine
+        self._lock = threading.Lock()
+        # Diarization runs here while the calling thread transcribes
+        self._stage_pool = ThreadPoolExecutor(max_workers=1)
+        self.load_time = time.perf_counter() - load_start
+        self.last_run_stats = {}
+        print(f"⏱️  Models loaded in {self.load_time:.1f}s")
 
-    def analyze_audio(self, audio_path: str):
+    def warm_up(self):
+        """
+        Runs one second of silence through both models so the first real video
+        doesn't pay for lazy kernel/graph initialization.
+        """
+        import torch
+        warm_start = time.perf_counter()
+        silence = np.zeros(SAMPLE_RATE, dtype=np.float32)
+        with self._lock:
+            segments, _ = self.model.transcribe(silence, beam_size=1)
+            list(segments)  # transcribe() is lazy; force the decode
+            if self.diarization_pipeline:
+                try:
+                    self.diarization_pipeline({
+                        "waveform": torch.from_numpy(silence).unsqueeze(0),
+                        "sample_rate": SAMPLE_RATE,
+                    })
+                except Exception:
+                    pass  # Silence may legitimately yield no speakers
+        print(f"🔥 Perception engine warmed up in {time.perf_counter() - warm_start:.1f}s")
+        return self
+
+    def analyze_audio(self, audio_path: str, mmap: bool = None):
         """
         Runs the triple-pipeline: Speaker Diarization + Transcription + Signal Audit.
         Returns a list of 'Verified Segments' with speaker labels.
+        The file is decoded once and the same buffer feeds all three stages
+        (memory-mapped from disk when mmap, default: the "mmap_audio" setting).
         """
+        if mmap is None:
+            mmap = self.settings["mmap_audio"]
         if not os.path.exists(audio_path):
             raise FileNotFoundError(f"Audio file not found: {audio_path}")
 
-        # 1 Load Audio for Signal Processing (Librosa)
+        # 1 Decode once (shared 16 kHz mono buffer)
         print("📊 Loading audio for signal analysis...")
-        y, sr = librosa.load(audio_path, sr=16000)
-        
-        # Calculate distinct noise metrics
-        rms_energy = librosa.feature.rms(y=y)[0]
+        rss = RunPeakRSS().start()
+        decode_start = time.perf_counter()
+        y, cache_path = load_waveform(audio_path, mmap=mmap)
+        sr = SAMPLE_RATE
+        decode_time = time.perf_counter() - decode_start
+        buffer_mb = y.nbytes / (1024 * 1024)
+
+        inference_start = time.perf_counter()
+        try:
+            with self._lock:
+                verified_segments, run_stats = self._analyze_waveform(y, sr)
+        finally:
+            # Drop our references before removing the spill file (Windows keeps mapped files locked)
+            del y
+            if cache_path and os.path.exists(cache_path):
+                os.remove(cache_path)
+            peak = rss.stop()
+
+        inference_time = time.perf_counter() - inference_start
+
+        self.last_run_stats = {
+            "model_load_time": self.load_time,
+            "decode_time": decode_time,
+            "inference_time": inference_time,
+            "buffer_mb": buffer_mb,
+            "run_peak_rss_mb": peak,
+            **run_stats,
+        }
+        print(
+            f"📈 Model load: {self.load_time:.1f}s (one-off) | Decode: {decode_time:.1f}s"
+            f" | Inference: {inference_time:.1f}s | Audio buffer: {buffer_mb:.1f} MB"
+            + (f" | Peak RSS (this run): {peak:.0f} MB" if peak is not None else "")
+        )
+        return verified_segments
+
+    def iter_segments(self, audio_path: str, window_s: float = STREAM_WINDOW_S, overlap_s: float = STREAM_OVERLAP_S):
+        """
+        Streaming variant of analyze_audio for arbitrarily long audio.
+        Decodes and analyzes one overlapping window at a time and yields each
+        window's finished segments as soon as it is done, so memory is bounded
+        by the window length instead of the file length.
+        NOTE: diarization runs per window, so the same label in two windows
+        need not be the same person. With several windows, labels are prefixed
+        with the window number (W2_SPEAKER_00) so different people are never
+        merged under one name.
+        """
+        if not os.path.exists(audio_path):
+            raise FileNotFoundError(f"Audio file not found: {audio_path}")
+        import librosa
+
+        total = get_audio_duration(audio_path)
+        n_windows = max(1, int(np.ceil(total / window_s)))
+        print(f"🌊 Streaming {total / 60:.1f} min of audio in {n_windows} windows...")
+
+        window_start = 0.0
+        emitted_until = 0.0
+        window_idx = 0
+        stage_totals = {}
+        run_start = time.perf_counter()
+        rss = RunPeakRSS().start()
+        try:
+            while window_start < total:
+                window_idx += 1
+                window_end = min(window_start + window_s, total)
+                is_last = window_end >= total
 
+                # Decode only this window (+ overlap margins) into memory
+                decode_from = max(0.0, window_start - overlap_s)
+                decode_to = min(total, window_end + overlap_s)
+                y, _ = librosa.load(
+                    audio_path, sr=SAMPLE_RATE, mono=True, dtype=np.float32,
+                    offset=decode_from, duration=decode_to - decode_from
+                )
+                print(f"   Window {window_idx}/{n_windows}: {window_start:.0f}s - {window_end:.0f}s")
+
+                with self._lock:
+                    window_segments, window_stats = self._analyze_waveform(y, SAMPLE_RATE, offset=decode_from)
+                del y
+                for key, value in window_stats.items():
+                    stage_totals[key] = stage_totals.get(key, 0.0) + value
+
+                for seg in window_segments:
+                    # A window owns the segments that START inside it; the margins only
+                    # exist for context, and emitted_until guards against re-emitting
+                    # speech the previous window already covered.
+                    if seg["start"] < max(window_start, emitted_until):
+                        continue
+                    if seg["start"] >= window_end and not is_last:
+                        continue
+                    emitted_until = seg["end"]
+                    if n_windows > 1:
+                        seg["speaker"] = f"W{window_idx}_{seg['speaker']}"
+                    yield seg
+
+                window_start = window_end
+        finally:
+            peak = rss.stop()
+
+        self.last_run_stats = {
+            "model_load_time": self.load_time,
+            "inference_time": time.perf_counter() - run_start,
+            "windows": n_windows,
+            "vad_skipped_fraction": stage_totals.get("vad_skipped_s", 0.0) / total if total else 0.0,
+            "run_peak_rss_mb": peak,
+            **stage_totals,
+        }
+
+    def _decode(self, audio, sr, cut_points, vad_filter: bool):
+        """
+        Runs Whisper over `audio`. With num_workers > 1 a long buffer is split at
+        `cut_points` (silences, in seconds) into windows that are decoded side by
+        side and stitched back in order.
+        Returns (starts, ends, texts, avg_logprobs, info, decoded_seconds).
+        """
+        audio_s = len(audio) / sr
+        window_s = float(self.settings["parallel_window_s"])
+        if self.num_workers > 1 and audio_s > window_s:
+            bounds = plan_windows(cut_points, audio_s, window_s)
+        else:
+            bounds = np.array([0.0, audio_s])
+
+        def decode_window(i):
+            lo, hi = int(bounds[i] * sr), int(bounds[i + 1] * sr)
+            segments, info = self.model.transcribe(audio[lo:hi], beam_size=5, vad_filter=vad_filter)
+            return list(segments), info  # transcribe() is lazy; decode inside the worker
+
+        n_windows = len(bounds) - 1
+        if n_windows > 1:
+            print(f"   ⚡ Decoding {n_windows} windows on {self.num_workers} workers...")
+            with ThreadPoolExecutor(max_workers=self.num_workers) as pool:
+                results = list(pool.map(decode_window, range(n_windows)))
+        else:
+            results = [decode_window(0)]
+
+        starts, ends, texts, avg_logprobs = [], [], [], []
+        decoded_s = 0.0
+        for window_start, (segments, info) in zip(bounds, results):
+            for seg in segments:
+                starts.append(seg.start + window_start)
+                ends.append(seg.end + window_start)
+                texts.append(seg.text)
+                avg_logprobs.append(seg.avg_logprob)
+            decoded_s += info.duration_after_vad if vad_filter else info.duration
+
+        return (np.array(starts, dtype=np.float64), np.array(ends, dtype=np.float64), texts,
+                np.array(avg_logprobs, dtype=np.float64), results[0][1], decoded_s)
+
+    def _transcribe(self, y, sr, rms_energy):
+        """
+        Whisper over the buffer, with non-speech cut out first (VAD).
+        Returns (starts, ends, texts, avg_logprobs, stats); timestamps are on
+        the buffer's own timeline even when silences were skipped.
+        """
+        # 3 TRANSCRIBE (Whisper) [The Content Layer]
+        print("🗣️  Transcribing...")
+        audio_s = len(y) / sr
+        vad_mode = self.settings["vad"]
+        audio = y
+        remap = None
+
+        # Reuse the RMS we already computed: no extra model, no extra decode.
+        # The regions also give parallel decoding its silence cut points.
+        speech_starts, speech_ends = speech_regions(
+            rms_energy, sr, HOP_LENGTH, audio_s,
+            threshold_db=self.settings["vad_threshold_db"],
+            min_silence_s=self.settings["vad_min_silence_s"],
+            pad_s=self.settings["vad_pad_s"],
+        )
+        cut_points = (speech_ends[:-1] + speech_starts[1:]) / 2
+
+        if vad_mode == "rms" and len(speech_starts) == 0 and audio_s > 0:
+            # Never drop audio on the VAD's word alone: let Whisper decide
+            print("   🔇 VAD found no speech regions, decoding the whole buffer.")
+        # Only worth a copy when there is a meaningful amount to cut
+        elif vad_mode == "rms" and np.sum(speech_ends - speech_starts) < 0.98 * audio_s:
+            audio, compact_starts, original_starts = compact_audio(y, sr, speech_starts, speech_ends)
+            remap = (compact_starts, original_starts)
+            cut_points = compact_starts[1:]  # Every join in the compacted audio was a silence
+
+        if len(audio) == 0:
+            print("   🔇 No speech detected.")
+            empty = np.empty(0)
+            return empty, empty, [], empty, {"vad_skipped_s": audio_s, "vad_saved_s": 0.0, "transcribe_time": 0.0}
+
+        transcribe_start = time.perf_counter()
+        # faster-whisper accepts a 16 kHz float32 array directly, skipping its own decode
+        # ("silero" uses faster-whisper's built-in VAD, which restores timestamps itself)
+        starts, ends, texts, avg_logprobs, info, decoded_s = self._decode(
+            audio, sr, cut_points, vad_filter=(vad_mode == "silero")
+        )
+        transcribe_time = time.perf_counter() - transcribe_start
+        print(f"   Detected language: {info.language} (Probability: {info.language_probability:.2f})")
+
+        if remap is not None and len(starts):
+            starts = remap_times(starts, *remap)
+            ends = remap_times(ends, *remap, is_end=True)
+
+        skipped_s = max(0.0, audio_s - decoded_s)
+        # Decoding cost is roughly linear in audio length
+        saved_s = transcribe_time / decoded_s * skipped_s if decoded_s > 0 else 0.0
+        if skipped_s > 0:
+            print(f"   🔇 VAD skipped {skipped_s / audio_s:.0%} of the audio ({skipped_s:.1f}s), "
+                  f"saving ~{saved_s:.1f}s of decoding")
+
+        stats = {"vad_skipped_s": skipped_s, "vad_saved_s": saved_s, "transcribe_time": transcribe_time}
+        return starts, ends, texts, avg_logprobs, stats
+
+    def _diarize(self, y, sr):
+        """Pyannote over the shared buffer. Returns (annotation or None, seconds taken)."""
         # 2 DIARIZATION [The Identity Layer]
         print("👥 Identifying speakers (Diarization)...")
+        diarize_start = time.perf_counter()
         diarization = None
         
         if self.diarization_pipeline:
+            import torch
             try:
                 # --- THE WINDOWS FIX ---
-                # We bypass the 'AudioDecoder' crash by loading the file ourselves 
-                # using torchaudio, which works reliably on Windows.
-                
-                # 1. Load the audio into a Tensor
-                waveform, sample_rate = torchaudio.load(audio_path)
+                # We bypass the 'AudioDecoder' crash by handing Pyannote an
+                # in-memory tensor instead of a file path.
+                # torch.from_numpy shares memory with the decoded buffer (no copy).
+                waveform = torch.from_numpy(y).unsqueeze(0)
                 
-                # 2. Wrap it in a dictionary (Pyannote In-Memory format)
                 audio_in_memory = {
                     "waveform": waveform, 
-                    "sample_rate": sample_rate
+                    "sample_rate": sr
                 }
                 
-                # 3. Pass the dictionary instead of the file path
                 diarization = self.diarization_pipeline(audio_in_memory)
                 
             except Exception as e:
@@ -86,65 +499,84 @@ class PerceptionEngine:
         else:
             print("⚠️ Skipping Diarization (Pipeline not loaded).")
 
-        # 3 TRANSCRIBE (Whisper) [The Content Layer]
-        print("🗣️  Transcribing...")
-        segments, info = self.model.transcribe(audio_path, beam_size=5)
+        return diarization, time.perf_counter() - diarize_start
+
+    def _analyze_waveform(self, y, sr, offset: float = 0.0):
+        """
+        Diarization + transcription + signal audit over an already-decoded buffer.
+        `offset` (seconds) shifts the returned timestamps onto the file's timeline.
+        Returns (verified_segments, stats).
+        """
+
+        import librosa
+
+        # Calculate distinct noise metrics
+        rms_energy = librosa.feature.rms(y=y, hop_length=HOP_LENGTH)[0]
+
+        # 2 + 3 DIARIZATION and TRANSCRIPTION run side by side: neither needs
+        # the other until speaker labels are assigned. Both torch and
+        # ctranslate2 release the GIL, so a thread is enough (and shares `y`).
+        stages_start = time.perf_counter()
+        if self.settings["parallel_stages"]:
+            diarization_job = self._stage_pool.submit(self._diarize, y, sr)
+            starts, ends, texts, avg_logprobs, stats = self._transcribe(y, sr, rms_energy)
+            diarization, diarization_time = diarization_job.result()
+        else:
+            diarization, diarization_time = self._diarize(y, sr)
+            starts, ends, texts, avg_logprobs, stats = self._transcribe(y, sr, rms_energy)
+        stages_time = time.perf_counter() - stages_start
+
+        stats["diarization_time"] = diarization_time
+        # Wall-clock won back by overlapping the two stages
+        stats["overlap_saved_s"] = max(0.0, diarization_time + stats["transcribe_time"] - stages_time)
+        print(f"   ⏱️  Diarization {diarization_time:.1f}s | Transcription {stats['transcribe_time']:.1f}s"
+              f" | Wall {stages_time:.1f}s (overlap saved {stats['overlap_saved_s']:.1f}s)")
 
         verified_segments = []
-        print(f"   Detected language: {info.language} (Probability: {info.language_probability:.2f})")
 
-        for segment in segments:
-            # The Cross-Modal Verification Logic
-            
-            # Assign Speaker (Who spoke the most during this segment?)
-            speaker_label = "Speaker ??"
-            
-            if diarization:
-                try:
-                    # Use segment.start/end
-                    t_segment = Segment(segment.start, segment.end)
-                    
-                    # Crop the diarization timeline to this text segment
-                    overlap = diarization.crop(t_segment)
-                    
-                    # argmax() returns the label with the most duration in this crop
-                    if len(overlap) > 0:
-                        speaker_label = overlap.argmax() 
-                except Exception:
-                    pass # Keep default label if matching fails
+        # Assign Speakers (Who spoke the most during each segment?)
+        # One sweep over sorted speaker turns for ALL segments, instead of a
+        # diarization.crop() timeline scan per segment.
+        turns = ([], [], [])
+        if diarization:
+            try:
+                turns = diarization_to_arrays(diarization)
+            except Exception as e:
+                print(f"⚠️ Speaker matching failed (using fallback 'Speaker ??'): {e}")
+        speaker_labels = assign_speakers(starts, ends, *turns)
 
-            # Extract the noise profile
-            # mapping the timestamp to the array index of the RMS signal
-            start_frame = int(segment.start * sr / 512)
-            end_frame = int(segment.end * sr / 512)
-            
-            # Safe indexing
-            segment_noise = rms_energy[start_frame:end_frame]
-            avg_noise = np.mean(segment_noise) if len(segment_noise) > 0 else 0.0
-
-            # THE TRUST SCORE FORMULA
-            """
-            This further needs more scientific approach, intended in future scopes.!!!
-            """
-            confidence = np.exp(segment.avg_logprob) 
-            trust_score = confidence * (1.0 - min(avg_noise, 0.5)) 
-            status = "✅ Verified" if trust_score > 0.6 else "⚠️ Suspicious"
+        # SIGNAL AUDIT (vectorized over all segments)
+        # Noise = mean RMS inside each segment (prefix sum over RMS frames),
+        # then every enabled scorer contributes a multiplier to the trust score.
+        features = {
+            "starts": starts,
+            "ends": ends,
+            "confidence": np.exp(avg_logprobs),
+            "noise": segment_means(rms_energy, starts, ends, sr, HOP_LENGTH),
+            "waveform": y,
+            "sample_rate": sr,
+            "hop_length": HOP_LENGTH,
+        }
+        trust_scores, suspicious = score_segments(features, self.trust_scorers)
+
+        for i, (text, speaker_label) in enumerate(zip(texts, speaker_labels)):
+            status = "⚠️ Suspicious" if suspicious[i] else "✅ Verified"
 
             verified_segments.append({
-                "start": segment.start,
-                "end": segment.end,
+                "start": float(starts[i]) + offset,
+                "end": float(ends[i]) + offset,
                 "speaker": speaker_label,
-                "text": segment.text.strip(),
-                "confidence": round(confidence, 2),
-                "noise_level": round(float(avg_noise), 3),
-                "trust_score": round(trust_score, 2),
+                "text": text.strip(),
+                "confidence": round(float(features["confidence"][i]), 2),
+                "noise_level": round(float(features["noise"][i]), 3),
+                "trust_score": round(float(trust_scores[i]), 2),
                 "status": status
             })
 
             # Print concise progress
-            print(f"[{segment.start:.1f}s] {speaker_label}: {segment.text[:40]}... ({status})")
+            print(f"[{starts[i] + offset:.1f}s] {speaker_label}: {text[:40]}... ({status})")
 
-        return verified_segments
+        return verified_segments, stats
 
 
 # Test Block
@@ -153,15 +585,15 @@ if __name__ == "__main__":
     if not os.path.exists(data_dir):
          print("❌ Data folder not found.")
     else:
-        wav_files = [f for f in os.listdir(data_dir) if f.endswith(".wav")]
+        audio_files = [f for f in os.listdir(data_dir) if f.endswith((".wav", ".flac"))]
         
-        if wav_files:
-            test_file = os.path.join(data_dir, wav_files[0])
+        if audio_files:
+            test_file = os.path.join(data_dir, audio_files[0])
             print(f"🧪 Testing on: {test_file}")
             
-            engine = PerceptionEngine()
+            engine = get_engine()
             results = engine.analyze_audio(test_file)
             
             print(f"\n✅ Completed! Analyzed {len(results)} segments.")
         else:
-            print("❌ No .wav files found in data/ folder. Run ingestion.py first!")
\ No newline at end of file
+            print("❌ No audio files found in data/ folder. Run ingestion.py first!")
\ No newline at end of file
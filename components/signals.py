@@ -0,0 +1,228 @@
+# Pure-NumPy helpers for the Perception Engine's cross-modal verification.
+# Kept free of model imports so they are cheap to reuse and benchmark.
+
+import numpy as np
+
+UNKNOWN_SPEAKER = "Speaker ??"
+
+
+def diarization_to_arrays(diarization):
+    """
+    Flattens a pyannote Annotation into sorted (starts, ends, labels) arrays,
+    so speaker turns are walked once instead of once per transcript segment.
+    """
+    turns = sorted(
+        (turn.start, turn.end, label)
+        for turn, _, label in diarization.itertracks(yield_label=True)
+    )
+    if not turns:
+        return np.empty(0), np.empty(0), np.empty(0, dtype=object)
+    starts, ends, labels = zip(*turns)
+    return np.asarray(starts, dtype=np.float64), np.asarray(ends, dtype=np.float64), np.asarray(labels, dtype=object)
+
+
+def _covered_until(times, starts, ends, cum_before):
+    """Total duration of disjoint sorted intervals that lies before each time in `times`."""
+    idx = np.searchsorted(starts, times, side="right") - 1
+    safe = np.clip(idx, 0, None)
+    partial = np.clip(times - starts[safe], 0.0, ends[safe] - starts[safe])
+    return np.where(idx >= 0, cum_before[safe] + partial, 0.0)
+
+
+def assign_speakers(seg_starts, seg_ends, turn_starts, turn_ends, turn_labels, default=UNKNOWN_SPEAKER):
+    """
+    Majority-overlap speaker for every segment in one vectorized pass.
+
+    Equivalent to `diarization.crop(Segment(s, e)).argmax()` per segment: for
+    each label, its turns are merged into a disjoint timeline with a prefix sum
+    of durations, so the overlap with any [s, e] is two binary searches.
+    Cost is O((segments + turns) * log(turns)) per speaker instead of
+    O(segments * turns). Ties go to the alphabetically first label (like
+    pyannote); segments with no overlapping turn get `default`.
+    """
+    seg_starts = np.asarray(seg_starts, dtype=np.float64)
+    seg_ends = np.asarray(seg_ends, dtype=np.float64)
+    result = np.full(len(seg_starts), default, dtype=object)
+    if len(seg_starts) == 0 or len(turn_starts) == 0:
+        return result
+
+    turn_starts = np.asarray(turn_starts, dtype=np.float64)
+    turn_ends = np.asarray(turn_ends, dtype=np.float64)
+    turn_labels = np.asarray(turn_labels, dtype=object)
+    labels = np.unique(turn_labels)
+
+    overlap = np.zeros((len(labels), len(seg_starts)))
+    for row, label in enumerate(labels):
+        mask = turn_labels == label
+        order = np.argsort(turn_starts[mask], kind="stable")
+        starts = turn_starts[mask][order]
+        ends = turn_ends[mask][order]
+
+        # Merge overlapping turns of the same speaker (pyannote measures the union)
+        running_end = np.maximum.accumulate(ends)
+        new_block = np.r_[True, starts[1:] > running_end[:-1]]
+        block_id = np.cumsum(new_block) - 1
+        merged_starts = starts[new_block]
+        merged_ends = np.zeros(len(merged_starts))
+        np.maximum.at(merged_ends, block_id, ends)
+
+        cum_before = np.r_[0.0, np.cumsum(merged_ends - merged_starts)[:-1]]
+        overlap[row] = (
+            _covered_until(seg_ends, merged_starts, merged_ends, cum_before)
+            - _covered_until(seg_starts, merged_starts, merged_ends, cum_before)
+        )
+
+    best = np.argmax(overlap, axis=0)
+    has_speaker = overlap[best, np.arange(len(seg_starts))] > 0
+    result[has_speaker] = labels[best[has_speaker]]
+    return result
+
+
+# --- Trust scoring ---
+# Trust = Whisper confidence x the product of every enabled scorer's multiplier.
+# A scorer takes the per-segment feature dict (arrays, one entry per segment)
+# and returns multipliers in [0, 1] (1 = no penalty). New signal features
+# (SNR, clipping, spectral flatness, ...) are added by registering a scorer,
+# never by touching the per-segment loop.
+
+TRUST_THRESHOLD = 0.6
+TRUST_SCORERS = {}
+
+
+def register_scorer(name: str):
+    def decorator(fn):
+        TRUST_SCORERS[name] = fn
+        return fn
+    return decorator
+
+
+def segment_means(frame_values, seg_starts, seg_ends, sample_rate: int, hop_length: int):
+    """
+    Mean of a frame-level signal (one value per hop) inside each segment, via a
+    prefix sum: O(1) per segment. Segments that fall outside the signal get 0.0.
+    """
+    frame_values = np.asarray(frame_values)
+    n_frames = len(frame_values)
+    # Same seconds -> frame mapping as int(t * sr / hop)
+    start_frames = np.clip((np.asarray(seg_starts, dtype=np.float64) * sample_rate / hop_length).astype(np.int64), 0, n_frames)
+    end_frames = np.clip((np.asarray(seg_ends, dtype=np.float64) * sample_rate / hop_length).astype(np.int64), 0, n_frames)
+
+    prefix = np.r_[0.0, np.cumsum(frame_values, dtype=np.float64)]
+    counts = end_frames - start_frames
+    totals = prefix[np.maximum(end_frames, start_frames)] - prefix[start_frames]
+    return np.where(counts > 0, totals / np.maximum(counts, 1), 0.0)
+
+
+@register_scorer("noise")
+def noise_penalty(features):
+    """
+    THE ORIGINAL TRUST SCORE FORMULA: confidence * (1 - min(noise, 0.5))
+    This further needs more scientific approach, intended in future scopes.!!!
+    """
+    return 1.0 - np.minimum(features["noise"], 0.5)
+
+
+@register_scorer("clipping")
+def clipping_penalty(features):
+    """Penalizes segments where the waveform sits at full scale (distorted audio)."""
+    y, sr, hop = features["waveform"], features["sample_rate"], features["hop_length"]
+    n_frames = len(y) // hop
+    clipped = (np.abs(y[:n_frames * hop]) >= 0.99).reshape(n_frames, hop).mean(axis=1)
+    ratio = segment_means(clipped, features["starts"], features["ends"], sr, hop)
+    return 1.0 - np.minimum(ratio * 5.0, 0.5)
+
+
+def score_segments(features, scorers=("noise",)):
+    """
+    Vectorized trust pass over all segments.
+    Returns (trust_scores, is_suspicious) arrays.
+    """
+    trust = np.asarray(features["confidence"], dtype=np.float64).copy()
+    for name in scorers:
+        trust *= TRUST_SCORERS[name](features)
+    return trust, ~(trust > TRUST_THRESHOLD)
+
+
+# --- Voice activity (RMS-based) ---
+# Long silences, intros and pauses are cut out before Whisper decodes, reusing
+# the RMS energy the signal audit already computed. Timestamps from the
+# compacted audio are mapped back onto the original timeline.
+
+# RMS below this (~-80 dBFS) is digital silence: it never sets the reference
+# level and is never speech
+SILENCE_FLOOR_RMS = 1e-4
+
+def speech_regions(rms, sample_rate: int, hop_length: int, total_seconds: float,
+                   threshold_db: float = -35.0, min_silence_s: float = 1.0, pad_s: float = 0.25):
+    """
+    Returns (starts, ends) in seconds of the regions worth transcribing.
+    A frame is 'speech' if its RMS is within `threshold_db` of the loud end of
+    the file (95th percentile of the non-silent frames, so long digital-silence
+    intros don't drag it to zero); silences shorter than `min_silence_s` are kept
+    so sentences aren't chopped, and every region is padded by `pad_s`.
+    """
+    rms = np.asarray(rms, dtype=np.float64)
+    audible = rms[rms > SILENCE_FLOOR_RMS]
+    reference = np.percentile(audible, 95) if len(audible) else 0.0
+    if reference <= 0:
+        return np.empty(0), np.empty(0)
+
+    voiced = rms > max(reference * 10 ** (threshold_db / 20), SILENCE_FLOOR_RMS)
+    edges = np.flatnonzero(np.diff(np.r_[0, voiced.astype(np.int8), 0]))
+    if len(edges) == 0:
+        return np.empty(0), np.empty(0)
+
+    frame_s = hop_length / sample_rate
+    starts = np.clip(edges[0::2] * frame_s - pad_s, 0.0, total_seconds)
+    ends = np.clip(edges[1::2] * frame_s + pad_s, 0.0, total_seconds)
+
+    # Bridge gaps that are too short to count as silence
+    keep_gap = (starts[1:] - ends[:-1]) >= min_silence_s
+    return starts[np.r_[True, keep_gap]], ends[np.r_[keep_gap, True]]
+
+
+def plan_windows(cut_points, total_seconds: float, window_s: float):
+    """
+    Greedy split of [0, total_seconds] into windows of at most ~window_s that
+    only ever cut at `cut_points` (silences). A stretch with no cut point
+    stays whole even if it runs longer. Returns the window boundaries.
+    """
+    cuts = np.sort(np.asarray(cut_points, dtype=np.float64))
+    cuts = cuts[(cuts > 0) & (cuts < total_seconds)]
+    bounds = [0.0]
+    while total_seconds - bounds[-1] > window_s:
+        i = np.searchsorted(cuts, bounds[-1] + window_s, side="right") - 1
+        if i >= 0 and cuts[i] > bounds[-1]:
+            bounds.append(float(cuts[i]))
+            continue
+        # No silence inside this window: cut at the next one after it
+        j = np.searchsorted(cuts, bounds[-1], side="right")
+        if j == len(cuts):
+            break
+        bounds.append(float(cuts[j]))
+    bounds.append(float(total_seconds))
+    return np.array(bounds)
+
+
+def compact_audio(y, sample_rate: int, starts, ends):
+    """
+    Concatenates the speech regions of `y`.
+    Returns (y_speech, compact_starts, original_starts) for remap_times().
+    """
+    bounds = [(int(s * sample_rate), int(e * sample_rate)) for s, e in zip(starts, ends)]
+    lengths = np.array([e - s for s, e in bounds], dtype=np.int64)
+    compact_starts = np.r_[0, np.cumsum(lengths)[:-1]] / sample_rate
+    original_starts = np.array([s for s, _ in bounds]) / sample_rate
+    y_speech = np.concatenate([y[s:e] for s, e in bounds]) if bounds else y[:0]
+    return y_speech, compact_starts, original_starts
+
+
+def remap_times(times, compact_starts, original_starts, is_end: bool = False):
+    """
+    Maps timestamps on the compacted audio back to the original timeline.
+    An end time sitting exactly on a cut belongs to the region before it.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    idx = np.searchsorted(compact_starts, times, side="left" if is_end else "right") - 1
+    idx = np.clip(idx, 0, len(compact_starts) - 1)
+    return original_starts[idx] + (times - compact_starts[idx])
@@ -4,6 +4,95 @@ import os
 # Define the file path for storing configuration
 CONFIG_FILE = "config.json"
 
+# Defaults for the optional tuning sections of config.json
+# (any key left out of the file falls back to these)
+DEFAULT_SETTINGS = {
+    # Watchtower worker pools: I/O-bound scans/downloads, CPU-bound perception
+    # (one process + model copy each), rate-limited LLM calls
+    "workers": {
+        "scan": 4,
+        "download": 3,
+        "perception": max(1, (os.cpu_count() or 1) // 4),
+        "llm": 1,
+    },
+    # Perception Engine tuning
+    "perception": {
+        "model_size": "tiny",
+        "compute_type": "int8",
+        "device": "cpu",
+        # Parallel decoding of one long file: windows split at silences,
+        # num_workers decoded at once with cpu_threads each (0 = auto)
+        "num_workers": 1,
+        "cpu_threads": 0,
+        "parallel_window_s": 300,
+        "parallel_stages": True,     # Diarize while transcribing
+        "trust_scorers": ["noise"],  # See components/signals.py (e.g. add "clipping")
+        # Silence skipping before Whisper: "rms" (reuses the signal audit),
+        # "silero" (faster-whisper's built-in VAD) or "off"
+        "vad": "rms",
+        "vad_threshold_db": -35.0,   # Below the file's loud end (95th pct RMS)
+        "vad_min_silence_s": 1.0,    # Shorter pauses are kept
+        "vad_pad_s": 0.25,
+        # Decode into a memory-mapped .npy instead of RAM (for very long files)
+        "mmap_audio": False,
+        # Watchtower: transcribe in 10-minute windows (bounded worker memory,
+        # speaker labels only consistent per window). The CLI uses --stream.
+        "streaming": False,
+    },
+    # Audio intermediate written by ingestion (perception decodes at 16 kHz mono)
+    "ingestion": {
+        "audio_format": "flac",
+        "sample_rate": 16000,
+    },
+    # Groq model + its quota (defaults match the free tier of llama-3.1-8b-instant)
+    "llm": {
+        "model": "llama-3.1-8b-instant",
+        "requests_per_minute": 30,
+        "tokens_per_minute": 6000,
+        "max_concurrency": 4,
+        "max_retries": 5,
+        # Single-shot vs Map-Reduce is decided by what fits in one prompt
+        # (context window, capped by tokens_per_minute); map_chunk_tokens 0 = fill it
+        "context_window": 131072,
+        "map_chunk_tokens": 0,
+        "chunk_overlap_tokens": 100,
+        # Hugging Face repo with the model's tokenizer.json, for exact token
+        # counts (gated repos need HF_TOKEN); "" = estimate ~4 chars/token
+        "tokenizer": "",
+    },
+    # In-process Neural Search caches (entries; results are keyed by index version)
+    "search": {
+        "result_cache_size": 256,
+        "embedding_cache_size": 1024,
+    },
+    # Neural Search answers: how many results to fetch, and the token budget
+    # they are packed into (near-duplicates dropped, neighbours merged)
+    "rag": {
+        "candidates": 12,
+        "context_tokens": 1500,
+        "dedupe_similarity": 0.85,
+        "merge_gap_s": 2.0,
+    },
+    # On-disk LLM response cache (ttl_hours: 0 = never expire)
+    "llm_cache": {
+        "path": "./voxguard_cache/llm_responses.db",
+        "ttl_hours": 24 * 30,
+        "max_entries": 5000,
+    },
+    # Segment embeddings (Neural Memory). The model must stay the same once
+    # vectors are stored; threads = 0 leaves torch's default.
+    "embedding": {
+        "model": "all-MiniLM-L6-v2",
+        "batch_size": 64,
+        "threads": 0,
+        # Retrieval windows: same-speaker segments merged up to this many tokens
+        "chunk_tokens": 128,
+        "chunk_overlap_tokens": 32,
+        "cache_path": "./voxguard_cache/embeddings.db",
+        "cache_max_entries": 200000,
+    },
+}
+
 def load_config():
     # Check if the configuration file exists
     if not os.path.exists(CONFIG_FILE):
@@ -14,17 +103,24 @@ def load_config():
     with open(CONFIG_FILE, "r") as f:
         return json.load(f)
 
+def get_settings(section: str):
+    # Return one tuning section of the config, merged over its defaults
+    settings = dict(DEFAULT_SETTINGS.get(section, {}))
+    settings.update(load_config().get(section, {}))
+    return settings
+
 def save_config(channels, email, smtp_password):
     # Process the input channels string into a clean list
     # Splits by comma and strips whitespace
     channel_list = [c.strip() for c in channels.split(",") if c.strip()]
     
-    # Create dictionary to store
-    data = {
+    # Start from the existing file so tuning sections aren't wiped by the dashboard
+    data = load_config()
+    data.update({
         "channels": channel_list,
         "email": email,
         "smtp_password": smtp_password
-    }
+    })
     
     # Write dictionary to JSON file
     with open(CONFIG_FILE, "w") as f:
@@ -1,17 +1,31 @@
 import streamlit as st
-import pandas as pd
-from sqlalchemy import create_engine
 import time
 
 # Import backend functions
 from main import run_voxguard 
-from components.memory import query_memory
-from components.intelligence import answer_user_query
+from components.memory import search_memory, search_cache_stats
+from components.intelligence import answer_user_query_stream, RAG_SETTINGS
 from components.utils import save_config, load_config
+from components.database import get_version, get_feed_stats, get_feed_page, get_report
 
-# Database Connection
-DATABASE_URL = "sqlite:///./voxguard.db"
-engine = create_engine(DATABASE_URL)
+FEED_PAGE_SIZE = 20
+
+# Cached across reruns. `version` is bumped by save_analysis (in this process or
+# the monitor's), so a new analysis invalidates these automatically.
+@st.cache_data(show_spinner=False)
+def cached_feed_stats(version: int):
+    return get_feed_stats()
+
+@st.cache_data(show_spinner=False)
+def cached_feed_page(version: int, after: tuple):
+    return get_feed_page(FEED_PAGE_SIZE, after)
+
+@st.cache_data(show_spinner=False, max_entries=200)
+def cached_report(video_id: str, version: int):
+    return get_report(video_id)
+
+# One indexed lookup per rerun decides whether the caches above are still valid
+data_version = get_version("analyses")
 
 st.set_page_config(page_title="VoxGuard AI", page_icon="🛡️", layout="wide")
 
@@ -41,13 +55,12 @@ with st.sidebar:
 
     st.markdown("---")
     try:
-        df = pd.read_sql("SELECT * FROM video_memories ORDER BY processed_at DESC", engine)
-        st.metric("Total Videos Processed", len(df))
-        if not df.empty:
-            avg_trust = df['avg_confidence'].mean()
-            st.metric("Global Trust Score", f"{avg_trust:.2f}")
-    except:
-        df = pd.DataFrame()
+        stats = cached_feed_stats(data_version)
+    except Exception:
+        stats = {"total": 0, "avg_confidence": None, "flagged": 0}
+    st.metric("Total Videos Processed", stats["total"])
+    if stats["avg_confidence"] is not None:
+        st.metric("Global Trust Score", f"{stats['avg_confidence']:.2f}")
 
 st.title("🛡️ VoxGuard Intelligence Dashboard")
 
@@ -57,39 +70,91 @@ tab1, tab2, tab3 = st.tabs(["📊 Intelligence Feed", "🧠 Neural Search", "⚙
 
 # TAB 1: FEED
 with tab1:
-    if df.empty:
+    # Keyset pagination: the cursor of each page is the last row of the one before
+    # (a new analysis shifts every page, so the cursors start over)
+    if st.session_state.get("feed_version") != data_version:
+        st.session_state.feed_version = data_version
+        st.session_state.feed_cursors = [None]
+    cursors = st.session_state.feed_cursors
+
+    try:
+        page = cached_feed_page(data_version, cursors[-1])
+    except Exception:
+        page = []
+
+    if not page and len(cursors) == 1:
         st.info("No data yet. Configure settings or process a video.")
     
-    for index, row in df.iterrows():
+    for row in page:
         # Display Real Video Title
         with st.expander(f"{row['title']} (Trust: {row['avg_confidence']})"):
             if row['is_flagged']:
                 st.error("⚠️ Acoustic Anomalies Detected")
-            st.markdown(row['summary_report'])
+            # Reports are only fetched for the expanders the user actually opens up
+            if st.toggle("📄 Show report", key=f"report_{row['id']}"):
+                st.markdown(cached_report(row['id'], data_version) or "")
             st.caption(f"ID: {row['id']} | {row['processed_at']}")
 
+    prev_col, page_col, next_col = st.columns([1, 2, 1])
+    if len(cursors) > 1 and prev_col.button("⬅️ Newer"):
+        cursors.pop()
+        st.rerun()
+    page_col.caption(f"Page {len(cursors)}")
+    if len(page) == FEED_PAGE_SIZE and next_col.button("Older ➡️"):
+        last = page[-1]
+        cursors.append((last['processed_at'], last['id']))
+        st.rerun()
+
 # TAB 2: SEARCH
 with tab2:
     st.header("Search the Agent's Memory")
     query = st.text_input("Ask a question about your videos:", placeholder="What is the future of AI?")
+
+    # Filters are pushed down into both the vector and the keyword index
+    with st.expander("🔎 Filters"):
+        video_filter = st.text_input("Video IDs (comma separated, blank = all)")
+        min_confidence = st.slider("Minimum confidence", 0.0, 1.0, 0.0, 0.05)
+        exclude_flagged = st.checkbox("Exclude low-trust (flagged) segments")
+        date_range = st.date_input("Indexed between", value=())
+    filters = {
+        "video_id": [v.strip() for v in video_filter.split(",") if v.strip()],
+        "exclude_flagged": exclude_flagged,
+        "min_confidence": min_confidence or None,
+    }
+    if len(date_range) == 2:
+        filters["indexed_after"] = time.mktime(date_range[0].timetuple())
+        filters["indexed_before"] = time.mktime(date_range[1].timetuple()) + 86400
+
     if query:
         with st.spinner("Analyzing neural pathways..."):
-            results = query_memory(query, n_results=5)
+            results = search_memory(query, n_results=RAG_SETTINGS["candidates"], filters=filters)
+            timings = results['timings']
+            st.caption("⏱️ " + " | ".join(f"{stage}: {seconds * 1000:.0f} ms" for stage, seconds in timings.items()))
+            cache_stats = search_cache_stats()
+            st.caption(f"⚡ Search cache hit rate: {cache_stats['results']['hit_rate']:.0%} results, "
+                       f"{cache_stats['query_embeddings']['hit_rate']:.0%} query embeddings")
             if not results['documents']:
                 st.warning("No memories found.")
             else:
-                docs = results['documents'][0]
-                metas = results['metadatas'][0]
-                answer = answer_user_query(query, docs)
+                docs = results['documents']
+                metas = results['metadatas']
                 st.markdown("### 🤖 Agent Answer")
-                st.success(answer)
+                # Stream the answer in as it is written (cached answers appear at once)
+                llm_stats = {}
+                st.write_stream(answer_user_query_stream(query, docs, metas, llm_stats))
+                if llm_stats.get("cached"):
+                    st.caption("⚡ Cached answer")
+                elif llm_stats:
+                    st.caption(f"⏱️ First token: {llm_stats['time_to_first_token'] * 1000:.0f} ms | "
+                               f"{llm_stats['tokens_per_second'] or 0:.0f} tokens/s")
                 st.markdown("---")
                 st.subheader("📄 Evidence Sources")
                 for i, (doc, meta) in enumerate(zip(docs, metas)):
                     # Use .get with default to handle missing keys
                     title = meta.get('title', 'Unknown Video')
                     ts = meta.get('start_time', 0)
-                    with st.expander(f"Reference: {title} (at {ts:.1f}s)"):
+                    te = meta.get('end_time', ts)
+                    with st.expander(f"Reference: {title} ({ts:.1f}s - {te:.1f}s)"):
                         st.markdown(f"> *\"{doc}\"*")
                         if meta.get('is_flagged'):
                             st.warning("⚠️ Low Confidence Segment")
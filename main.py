@@ -1,78 +1,263 @@
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 # Import components
-from components.ingestion import download_audio
-from components.perception import PerceptionEngine
-from components.intelligence import generate_report
-from components.database import save_analysis, get_video_by_id
+from components.ingestion import download_audio, parse_video_id, resolve_video_id
+from components.perception import get_engine
+from components.intelligence import (
+    generate_report, generate_report_stream, summarize_transcript_part, format_transcript,
+    count_tokens, chunk_spans, SINGLE_SHOT_MAX_TOKENS, MAP_CHUNK_TOKENS
+)
+from components.database import (
+    save_analysis, get_video_by_id, record_stage, get_stage_output,
+    get_pipeline_status, is_pipeline_complete, save_segments, load_segment_dicts
+)
 from components.notifier import send_alert
-from components.memory import vector_store_segments
+from components.memory import vector_store_segments, delete_video_vectors
 
 def extract_video_id(url: str):
-    # Fallback method to get ID from URL string
-    if "v=" in url:
-        return url.split("v=")[1].split("&")[0]
-    return "unknown_id"
+    # Offline ID parse for logging (handles watch?v=, youtu.be, shorts, embed, live)
+    return parse_video_id(url) or "unknown_id"
 
-def run_voxguard(youtube_url: str):
-    # Initial ID extraction for logging
-    temp_id = extract_video_id(youtube_url)
+VECTOR_BATCH_SIZE = 64
 
-    print(f"\n🚀 VoxGuard Agent Activated for URL containing: {temp_id}")
-    print("="*60)
+def _stream_perception(engine, audio_path: str, video_id: str, video_title: str):
+    """
+    Consumes engine.iter_segments() and overlaps the downstream work with it:
+    segments are vectorized in batches and, once the transcript is long enough
+    to need Map-Reduce, finished chunks are summarized in the background.
+    Returns (segments, precomputed_summaries, vectorized).
+    """
+    segments = []
+    pending_vectors = []
+    vector_futures = []
+    summary_futures = []
+    # One transcript line per segment, exactly as generate_report builds them
+    lines, counts, speakers = [], [], []
+    covered = 0   # lines before this were sent to the Map step
+    carried = 0   # ...and this many after it are overlap from the last part sent
+    total_tokens = 0
+    pending_tokens = 0  # tokens from `covered` on
+
+    # Batches are upserts; clear the video's old vectors once, up front
+    delete_video_vectors(video_id)
+
+    with ThreadPoolExecutor(max_workers=2) as background:
+        for seg in engine.iter_segments(audio_path):
+            segments.append(seg)
+            pending_vectors.append(seg)
+            lines.append(format_transcript([seg]))
+            counts.append(count_tokens(lines[-1]) + 1)
+            speakers.append(seg['speaker'])
+            total_tokens += counts[-1]
+            pending_tokens += counts[-1]
+
+            if len(pending_vectors) >= VECTOR_BATCH_SIZE:
+                vector_futures.append(background.submit(vector_store_segments, video_id, video_title, pending_vectors))
+                pending_vectors = []
+
+            # Once the video is too long for one prompt, every finished Map part
+            # goes out right away. Same chunker as generate_report, so the parts
+            # (size cap, overlap, speaker breaks) match a non-streaming run;
+            # the last, still growing, part is kept back.
+            if total_tokens > SINGLE_SHOT_MAX_TOKENS and pending_tokens > MAP_CHUNK_TOKENS:
+                spans = chunk_spans(lines[covered:], speakers=speakers[covered:],
+                                    counts=counts[covered:], carried=carried)
+                for start, end in spans[:-1]:
+                    part = "\n".join(lines[covered + start:covered + end])
+                    summary_futures.append(background.submit(summarize_transcript_part, part))
+                if len(spans) > 1:
+                    carried = spans[-2][1] - spans[-1][0]
+                    covered += spans[-1][0]
+                    pending_tokens = sum(counts[covered:])
+
+        if pending_vectors:
+            vector_futures.append(background.submit(vector_store_segments, video_id, video_title, pending_vectors))
+        summaries = [f.result() for f in summary_futures]
+        vectorized = all(f.result() for f in vector_futures)
+
+    return segments, ((covered, carried, summaries) if summaries else None), vectorized
+
+# --- Pipeline stages ---
+# run_voxguard chains these in order; the Watchtower runs the same stages on
+# separate worker pools (download / perception / LLM).
+# Every stage checkpoints its output under the video ID (see database.PIPELINE_STAGES),
+# so a rerun skips whatever already finished and retries only what failed.
+
+def _fail(video_id: str, stage: str, error):
+    print(f"❌ Pipeline failed at {stage.capitalize()}: {error}")
+    record_stage(video_id, stage, "failed", error=str(error))
+    return False
+
+def ingest(youtube_url: str):
+    """
+    Stage 1: download the audio. Returns (audio_path, title, video_id),
+    or None if the download failed or the video was already processed.
+    audio_path is None when perception already finished (no audio needed).
+    """
+    # 0. MEMORY CHECK (before any bytes are fetched)
+    # Resolve the canonical ID first, so a duplicate URL costs no download
+    known_id = resolve_video_id(youtube_url) or "unknown_id"
+    if get_video_by_id(known_id) and (is_pipeline_complete(known_id) or not get_pipeline_status(known_id)):
+        print(f"🧠 I remember video '{known_id}'! Skipping download.")
+        return None
+
+    # Resume: a checkpointed video may not need its audio again
+    checkpoint = get_stage_output(known_id, "ingestion")
+    if checkpoint:
+        if is_pipeline_complete(known_id):
+            print(f"🧠 I remember '{checkpoint['title']}'! Skipping processing.")
+            return None
+        if get_stage_output(known_id, "perception") is not None:
+            print(f"♻️  Resuming '{checkpoint['title']}' after perception.")
+            return None, checkpoint["title"], known_id
+        if os.path.exists(checkpoint["audio_path"]):
+            print(f"♻️  Reusing downloaded audio for '{checkpoint['title']}'.")
+            return checkpoint["audio_path"], checkpoint["title"], known_id
 
-    # 1. INGESTION
     # We now unpack three values: path, title, and ID
     audio_path, video_title, video_id = download_audio(youtube_url)
     
     # Check if download failed
     if not audio_path:
         print("❌ Pipeline failed at Ingestion.")
-        return
+        if known_id != "unknown_id":
+            record_stage(known_id, "ingestion", "failed", {"url": youtube_url}, error="download failed")
+        return None
 
-    # 0. MEMORY CHECK (Moved after ingestion to use the real Video ID)
-    # Check if we have processed this specific ID before
-    if get_video_by_id(video_id):
+    # Re-check with the ID yt-dlp actually returned, in case it differs from ours
+    # (videos from before checkpointing have a VideoMemory row but no stages)
+    if video_id != known_id and get_video_by_id(video_id) and (is_pipeline_complete(video_id) or not get_pipeline_status(video_id)):
         print(f"🧠 I remember '{video_title}'! Skipping processing.")
         # Cleanup the downloaded file since we don't need it
         if os.path.exists(audio_path):
             os.remove(audio_path)
-        return
+        return None
 
-    # 2. PERCEPTION
-    try:
-        engine = PerceptionEngine()
-        # Analyze the audio file
-        segments = engine.analyze_audio(audio_path)
-    except Exception as e:
-        print(f"❌ Pipeline failed at Perception: {e}")
-        return
+    record_stage(video_id, "ingestion", "done", {
+        "url": youtube_url, "title": video_title, "audio_path": audio_path
+    })
+    return audio_path, video_title, video_id
 
-    # 3. INTELLIGENCE
-    # Generate report using the REAL video title
-    final_report = generate_report(video_title, segments)
+def perceive(audio_path: str, video_id: str, video_title: str, streaming: bool = False,
+             overlap_downstream: bool = True):
+    """
+    Stage 2: transcription + diarization + trust scoring.
+    Returns (segments, precomputed_summaries, vectorized).
+    streaming=True (opt-in: `--stream`, or perception.streaming in the monitor)
+    trades memory for speaker labels that are only consistent within each
+    window (see iter_segments).
+    overlap_downstream=False keeps streaming mode to pure audio work (used by
+    the Watchtower's perception processes).
+    """
+    if get_stage_output(video_id, "perception") is not None:
+        cached_segments = load_segment_dicts(video_id)
+        print(f"♻️  Loaded {len(cached_segments)} checkpointed segments.")
+        return cached_segments, None, False
 
-    # 4. SAVE MEMORY
-    full_transcript = " ".join([s['text'] for s in segments])
-    save_analysis(video_id, video_title, youtube_url, full_transcript, final_report, segments)
+    try:
+        # Shared engine: models are loaded once per process, not once per video
+        engine = get_engine()
 
-    # 5. VECTORIZE & STORE
-    vector_store_segments(video_id, video_title, segments)
+        vectorized = False
+        precomputed_summaries = None
+        if streaming and overlap_downstream:
+            # Long audio: windows stream out while vectors/summaries are built
+            segments, precomputed_summaries, vectorized = _stream_perception(engine, audio_path, video_id, video_title)
+        elif streaming:
+            segments = list(engine.iter_segments(audio_path))
+        else:
+            # Analyze the audio file
+            segments = engine.analyze_audio(audio_path)
+    except Exception as e:
+        _fail(video_id, "perception", e)
+        raise
+
+    # Segments live in the transcript_segments table; the checkpoint just points at them
+    if not save_segments(video_id, segments):
+        _fail(video_id, "perception", "segment write failed")
+        raise RuntimeError("segment write failed")
+    record_stage(video_id, "perception", "done", {"segments": len(segments)})
+    if vectorized:
+        record_stage(video_id, "vectorize", "done")
 
     # 6. LIFECYCLE MANAGEMENT
-    # Remove the large audio file to free up space
+    # Segments are checkpointed, so the large audio file can go right away
     if os.path.exists(audio_path):
         os.remove(audio_path)
         print(f"🧹 Cleanup: Deleted temp audio {audio_path}")
 
-    print("\n" + "="*60)
-    print("📄 FINAL INTELLIGENCE REPORT")
-    print("="*60)
-    print(final_report)
-    print("="*60)
+    return segments, precomputed_summaries, vectorized
+
+def _print_report_stream(video_title: str, segments: list, precomputed_summaries: tuple = None):
+    """Prints the report to the console token by token. Returns the full text (or an ❌ error)."""
+    stream = generate_report_stream(video_title, segments, precomputed_summaries)
+    try:
+        first = next(stream, "")  # Map phase (if any) runs before the header goes out
+        print("\n" + "="*60)
+        print("📄 FINAL INTELLIGENCE REPORT")
+        print("="*60)
+        parts = [first]
+        print(first, end="", flush=True)
+        for piece in stream:
+            parts.append(piece)
+            print(piece, end="", flush=True)
+        print("\n" + "="*60)
+        return "".join(parts)
+    except Exception as e:
+        print()
+        return f"❌ Error in report generation: {e}"
+
+def finalize(youtube_url: str, video_title: str, video_id: str, segments: list,
+             precomputed_summaries: tuple = None, vectorized: bool = False,
+             stream_output: bool = False):
+    """
+    Stages 3-7: report, save, vectorize and notify (each checkpointed). Returns True when all succeeded.
+    stream_output: print the report to the console as it is generated.
+    """
+    # 3. INTELLIGENCE
+    checkpoint = get_stage_output(video_id, "report")
+    streamed = False
+    if checkpoint:
+        final_report = checkpoint["report"]
+    elif stream_output:
+        final_report = _print_report_stream(video_title, segments, precomputed_summaries)
+        if final_report.startswith("❌"):
+            return _fail(video_id, "report", final_report)
+        streamed = True
+        record_stage(video_id, "report", "done", {"report": final_report})
+    else:
+        # Generate report using the REAL video title
+        final_report = generate_report(video_title, segments, precomputed_summaries)
+        if final_report.startswith("❌"):
+            return _fail(video_id, "report", final_report)
+        record_stage(video_id, "report", "done", {"report": final_report})
+
+    # 4. SAVE MEMORY
+    if get_stage_output(video_id, "save") is None:
+        full_transcript = " ".join([s['text'] for s in segments])
+        if not save_analysis(video_id, video_title, youtube_url, full_transcript, final_report, segments):
+            return _fail(video_id, "save", "database write failed")
+        record_stage(video_id, "save", "done")
+
+    # 5. VECTORIZE & STORE (already done batch-by-batch in streaming mode)
+    if not vectorized and get_stage_output(video_id, "vectorize") is None:
+        if not vector_store_segments(video_id, video_title, segments, replace=True):
+            return _fail(video_id, "vectorize", "vector store write failed")
+        record_stage(video_id, "vectorize", "done")
+
+    if not streamed:
+        print("\n" + "="*60)
+        print("📄 FINAL INTELLIGENCE REPORT")
+        print("="*60)
+        print(final_report)
+        print("="*60)
 
     # 7. NOTIFICATION
+    if get_stage_output(video_id, "notify") is not None:
+        return True
+
     # Calculate how many suspicious segments were found
     flagged_count = sum(1 for s in segments if s['status'] == "⚠️ Suspicious")
     
@@ -80,18 +265,46 @@ def run_voxguard(youtube_url: str):
     subject_line = f"VoxGuard Intel: {video_title}"
 
     # Send the email
-    send_alert(
+    sent = send_alert(
         subject=subject_line, 
         markdown_body=final_report, 
         video_title=video_title, 
         video_url=youtube_url, 
         dry_run=False
     )
+    if not sent:
+        return _fail(video_id, "notify", "email delivery failed")
+    record_stage(video_id, "notify", "done")
+    return True
+
+def run_voxguard(youtube_url: str, streaming: bool = False):
+    # Initial ID extraction for logging
+    temp_id = extract_video_id(youtube_url)
+
+    print(f"\n🚀 VoxGuard Agent Activated for URL containing: {temp_id}")
+    print("="*60)
+
+    # 1. INGESTION
+    ingested = ingest(youtube_url)
+    if not ingested:
+        return
+    audio_path, video_title, video_id = ingested
+
+    # 2. PERCEPTION
+    try:
+        segments, precomputed_summaries, vectorized = perceive(audio_path, video_id, video_title, streaming)
+    except Exception:
+        return
+
+    # 3-7. INTELLIGENCE -> NOTIFICATION
+    finalize(youtube_url, video_title, video_id, segments, precomputed_summaries, vectorized, stream_output=True)
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        url = sys.argv[1]
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if args:
+        url = args[0]
     else:
         url = "https://www.youtube.com/watch?v=jNQXAC9IVRw"
     
-    run_voxguard(url)
\ No newline at end of file
+    # --stream opts into streaming mode (bounded memory for very long audio)
+    run_voxguard(url, streaming="--stream" in sys.argv)
\ No newline at end of file
@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# Run from a scratch directory: importing the components creates voxguard.db
+# and the voxguard_cache/ files in the working directory
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+os.chdir(tempfile.mkdtemp(prefix="voxguard-tests-"))
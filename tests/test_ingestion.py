@@ -0,0 +1,14 @@
+from components.ingestion import parse_video_id
+
+
+def test_parses_youtube_hosts():
+    assert parse_video_id("https://www.youtube.com/watch?v=jNQXAC9IVRw") == "jNQXAC9IVRw"
+    assert parse_video_id("https://music.youtube.com/watch?v=jNQXAC9IVRw") == "jNQXAC9IVRw"
+    assert parse_video_id("https://youtu.be/jNQXAC9IVRw") == "jNQXAC9IVRw"
+    assert parse_video_id("https://www.youtube-nocookie.com/embed/jNQXAC9IVRw") == "jNQXAC9IVRw"
+
+
+def test_rejects_lookalike_hosts():
+    assert parse_video_id("https://notyoutube.com/watch?v=jNQXAC9IVRw") is None
+    assert parse_video_id("https://evilyoutube.com/watch?v=jNQXAC9IVRw") is None
+    assert parse_video_id("https://fakeyoutube-nocookie.com/embed/jNQXAC9IVRw") is None
@@ -0,0 +1,72 @@
+from components import memory
+
+
+class FakeCollection:
+    """Just enough of a Chroma collection for compact_memory()."""
+
+    def __init__(self, records):
+        # id -> (document, metadata)
+        self.records = dict(records)
+
+    def count(self):
+        return len(self.records)
+
+    def get(self, ids=None, include=None, limit=None, offset=0):
+        keys = ids if ids is not None else list(self.records)[offset:offset + limit]
+        return {
+            "ids": keys,
+            "documents": [self.records[k][0] for k in keys],
+            "metadatas": [self.records[k][1] for k in keys],
+            "embeddings": [[0.0] for _ in keys],
+        }
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        for chunk_id, doc, meta in zip(ids, documents, metadatas):
+            self.records[chunk_id] = (doc, meta)
+
+    def delete(self, ids):
+        for chunk_id in ids:
+            self.records.pop(chunk_id, None)
+
+
+def _compact(monkeypatch, records):
+    collection = FakeCollection(records)
+    monkeypatch.setattr(memory, "get_collection", lambda: collection)
+    memory.compact_memory()
+    return {chunk_id: doc for chunk_id, (doc, _) in collection.records.items()}
+
+
+def test_compact_keeps_deterministic_chunk_next_to_legacy_vector(monkeypatch):
+    meta = {"video_id": "vid", "start_time": 1.0}
+    result = _compact(monkeypatch, {
+        "vid_abcd1234": ("hello", meta),                 # legacy uuid-style vector
+        "vid_0000001000": ("hello there world", meta),   # current chunk
+    })
+    assert result == {
+        "vid_0000001000": "hello there world",
+        "vid_0000001000_1": "hello",
+    }
+
+
+def test_compact_merges_legacy_duplicates(monkeypatch):
+    meta = {"video_id": "vid", "start_time": 2.5}
+    result = _compact(monkeypatch, {
+        "a1": ("same text", meta),
+        "a2": ("same text", meta),
+        "vid_0000002500": ("same text", meta),
+    })
+    assert result == {"vid_0000002500": "same text"}
+
+
+def test_compact_keeps_keyword_index_in_sync(monkeypatch):
+    meta = {"video_id": "kwvid", "start_time": 3.0, "end_time": 4.0}
+    records = {
+        "kw_legacy_1": ("zebra crossing", meta),
+        "kw_legacy_2": ("zebra crossing", meta),
+    }
+    memory.save_chunks([{"chunk_id": i, "text": doc, **m} for i, (doc, m) in records.items()])
+
+    _compact(monkeypatch, records)
+
+    hits = memory.keyword_search("zebra", limit=10, filters={"video_id": "kwvid"})
+    assert [hit["chunk_id"] for hit in hits] == ["kwvid_0000003000"]
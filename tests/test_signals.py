@@ -0,0 +1,27 @@
+import numpy as np
+
+from components.signals import speech_regions
+
+SR = 16000
+HOP = 512
+
+
+def _rms(seconds_silent: float, seconds_speech: float):
+    frame_s = HOP / SR
+    silent = np.zeros(int(seconds_silent / frame_s))
+    speech = np.full(int(seconds_speech / frame_s), 0.1)
+    return np.r_[silent, speech]
+
+
+def test_speech_found_after_long_digital_silence():
+    # A 600 s window: 580 s of "starting soon" silence, then 20 s of speech
+    rms = _rms(580, 20)
+    starts, ends = speech_regions(rms, SR, HOP, 600.0)
+    assert len(starts) == 1
+    assert 579 < starts[0] < 581
+    assert ends[0] == 600.0
+
+
+def test_all_silence_has_no_regions():
+    starts, ends = speech_regions(np.zeros(1000), SR, HOP, 1000 * HOP / SR)
+    assert len(starts) == 0 and len(ends) == 0